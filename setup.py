@@ -16,9 +16,10 @@ setup(
     description="Youtube Sentiment Analysis",
     url="https://bitbucket.org/grigorasalex/youtube_sentiment_analysis/src/master/",
     packages=find_packages(),
+    package_data={'youtube_sentiment_analysis.modules.sentiment_module': ['sentiment_term.lex']},
     keywords='youtube search sentiment analysis',
     install_requires=requirements,
-    zip_safe=True,
+    zip_safe=False,
     classifiers=[
         'Development Status :: 1.0 - Release',
         "Programming Language :: Python :: 3.6",
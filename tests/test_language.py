@@ -0,0 +1,45 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+    Language detection tests
+    @alexandru_grigoras
+"""
+
+# Libraries
+import unittest
+
+from youtube_sentiment_analysis.modules.language import LanguageDetector, UNDETERMINED
+
+
+class TestLanguageDetector(unittest.TestCase):
+    """Tests of the language detection of comments"""
+
+    def setUp(self):
+        self.detector = LanguageDetector()
+
+    def test_short_english_comments(self):
+        """Short english comments sharing words with other languages are english"""
+        for text in ["No way", "no", "no words", "la la land is a movie", "a legend", "a masterpiece",
+                     "ur a legend", "Come on!", "I die", "die hard fans", "video is de best", "Great video",
+                     "I love this song", "first"]:
+            self.assertEqual(self.detector.detect(text), 'en', text)
+
+    def test_latin_languages(self):
+        """Comments with enough function words of another language are tagged with it"""
+        for text, language in [("Me encanta esta canción, es muy buena", 'es'),
+                               ("C'est très bien, j'adore cette vidéo", 'fr'),
+                               ("Das ist sehr gut und ich liebe es", 'de'),
+                               ("Eu amo essa música, é muito boa", 'pt'),
+                               ("Questo video è molto bello", 'it'),
+                               ("Dit is echt een heel mooi nummer", 'nl')]:
+            self.assertEqual(self.detector.detect(text), language, text)
+
+    def test_scripts(self):
+        """Non latin texts are tagged by their script"""
+        self.assertEqual(self.detector.detect("Отличное видео"), 'ru')
+        self.assertEqual(self.detector.detect("素晴らしい動画です"), 'ja')
+        self.assertEqual(self.detector.detect("123 !!!"), UNDETERMINED)
+
+
+if __name__ == '__main__':
+    unittest.main()
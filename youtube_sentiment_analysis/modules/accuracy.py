@@ -9,7 +9,6 @@
 import time
 
 import numpy as np
-from nltk.sentiment import SentimentIntensityAnalyzer
 from sklearn import model_selection
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
@@ -22,7 +21,8 @@ from sklearn.svm import NuSVC
 from youtube_sentiment_analysis.modules.process import ProcessData
 from youtube_sentiment_analysis.modules.sentiment_module import sentiment as anew
 from youtube_sentiment_analysis.modules.training import TrainClassifier
-from youtube_sentiment_analysis.modules.vote_classifier import VoteClassifier
+from youtube_sentiment_analysis.modules.vader import VaderScorer
+from youtube_sentiment_analysis.modules.vote_classifier import VoteClassifier, CASCADE_MARGIN
 
 # Constants
 
@@ -38,10 +38,13 @@ CLASSIFIERS_PATH = "youtube_sentiment_analysis/data/classifiers_large_dataset/"
 class TestAccuracy:
     """Class for testing the accuracy of the algorithms"""
 
-    def __init__(self, dataset_path, max_nr_docs):
-        """Class constructor"""
+    def __init__(self, dataset_path, max_nr_docs, cascade_margin=CASCADE_MARGIN):
+        """Class constructor
+            cascade_margin: margin of the cascade mode of the voting system compared with the full voting, None to
+                skip the comparison"""
         self.__dataset_path = dataset_path
         self.__max_nr_docs = max_nr_docs
+        self.__cascade_margin = cascade_margin
 
     def test_cross_val_score(self, k_fold, progress, console):
         """Testing Classifiers Accuracy using Cross-Validation Method"""
@@ -56,11 +59,14 @@ class TestAccuracy:
         x_elements = np.array(text_data)
         y_elements = np.array(label_values)
 
-        sid = SentimentIntensityAnalyzer()
+        sid = VaderScorer.get_instance()
 
         vader_accuracy = []
         anew_accuracy = []
         voting_accuracy = []
+        cascade_accuracy = []
+        cascade_drift = []
+        cascade_changed = 0
 
         process_data = ProcessData()
 
@@ -79,6 +85,7 @@ class TestAccuracy:
             test_values_anew = []
             test_values_voting = []
             predicted_values = []
+            token_lists = []
 
             for text, value in zip(x_test, y_test):
                 process_data.process_text(text)
@@ -91,6 +98,7 @@ class TestAccuracy:
                     test_values_vader.append("negative")
 
                 tokens = process_data.get_tokens()
+                token_lists.append(list(tokens))
 
                 if anew.sentiment(tokens)['valence'] >= 5.8:
                     test_values_anew.append("positive")
@@ -102,14 +110,26 @@ class TestAccuracy:
                 else:
                     predicted_values.append("positive")
 
-                # machine learning algorithms sentiment value
-                ml_algorithms_sentiment = voted_classifier.classify(text, process_data)
+            # machine learning algorithms sentiment values, for the whole fold
+            ml_algorithms_sentiment, _ = voted_classifier.classify_many(list(x_test), token_lists)
 
-                if ml_algorithms_sentiment >= 0:
+            for sentiment in ml_algorithms_sentiment:
+                if sentiment >= 0:
                     test_values_voting.append("positive")
                 else:
                     test_values_voting.append("negative")
 
+            # the same with the cascade voting mode, where the expensive classifiers only vote on undecided texts
+            if self.__cascade_margin is not None:
+                voted_classifier.set_cascade_margin(self.__cascade_margin)
+                cascade_sentiment, _ = voted_classifier.classify_many(list(x_test), token_lists)
+                voted_classifier.set_cascade_margin(None)
+
+                test_values_cascade = ["positive" if sentiment >= 0 else "negative" for sentiment in cascade_sentiment]
+                cascade_accuracy.append(accuracy_score(test_values_cascade, predicted_values, normalize=True))
+                cascade_drift.extend(np.abs(cascade_sentiment - ml_algorithms_sentiment))
+                cascade_changed += sum(1 for a, b in zip(test_values_cascade, test_values_voting) if a != b)
+
             acc_vader = accuracy_score(test_values_vader, predicted_values, normalize=True)
             acc_anew = accuracy_score(test_values_anew, predicted_values, normalize=True)
             acc_voting = accuracy_score(test_values_voting, predicted_values, normalize=True)
@@ -129,6 +149,18 @@ class TestAccuracy:
         console.append("> %s: %f (%f)" % ("ANEW", anew_accuracy_array.mean(), anew_accuracy_array.std()))
         console.append("> %s: %f (%f)" % ("VOTING", voting_accuracy_array.mean(), voting_accuracy_array.std()))
 
+        if cascade_drift:
+            cascade_accuracy_array = np.array(cascade_accuracy)
+            console.append("> %s: %f (%f)" % ("CASCADE", cascade_accuracy_array.mean(), cascade_accuracy_array.std()))
+            if voted_classifier.get_cascade_count():
+                console.append("> Cascade margin %g: %.1f%% early exits, drift from full voting %f mean, %f max, "
+                               "%.2f%% labels changed" %
+                               (self.__cascade_margin, 100 * voted_classifier.get_early_exit_ratio(),
+                                np.mean(cascade_drift), np.max(cascade_drift),
+                                100.0 * cascade_changed / len(cascade_drift)))
+            else:
+                console.append("> Cascade voting inactive (it needs both cheap and expensive enabled voters)")
+
         # prepare configuration for cross validation test harness
         models = [('NuSVC', NuSVC(nu=0.5, kernel='linear', probability=True, gamma='scale', cache_size=500,
                                   class_weight='balanced')),
@@ -9,9 +9,12 @@
 from __future__ import print_function
 
 import time
+from collections import Counter
 
 from nltk.probability import *
 
+from youtube_sentiment_analysis.modules.dedup import DuplicateDetector
+from youtube_sentiment_analysis.modules.language import LanguageDetector, UNDETERMINED
 from youtube_sentiment_analysis.modules.process import ProcessData
 from youtube_sentiment_analysis.modules.sentiment_module import sentiment as anew
 from youtube_sentiment_analysis.modules.store import StoreData
@@ -25,14 +28,36 @@ __author__ = 'Alexandru Grigoras'
 __email__ = 'alex_grigoras_10@yahoo.com'
 __status__ = 'release'
 
+CLASSIFY_BATCH_SIZE = 1000
+
 
 class DataAnalysis:
     """Analyse the data and determine sentiment and word frequency"""
 
-    def __init__(self, keyword, like_threshold_min, like_threshold_max):
+    def __init__(self, keyword, like_threshold_min, like_threshold_max, languages=('en', UNDETERMINED),
+                 near_duplicates=False, disabled_voters=(), cascade_margin=None, distilled=False, tokenizer=None):
+        """Class constructor
+            languages: language codes of the analysed comments (see LanguageDetector), the other comments are
+                skipped before the classifiers; None analyses all the comments
+            near_duplicates: reuse the results of a previous comment for the comments with mostly the same words,
+                not only for the copies of the same text (see DuplicateDetector)
+            disabled_voters: names of the voters left out of the voting system (e.g. NuSVC, see VoteClassifier)
+            cascade_margin: margin of the cascade mode of the voting system (see VoteClassifier.set_cascade_margin),
+                None votes with all the classifiers
+            distilled: classify with the distilled classifier, a single linear model mimicking the voting system
+                (see TrainClassifier.distill), if it was trained
+            tokenizer: Tokenizer of the comments (words, contractions, emoji and elongated words), None splits them
+                at whitespace like the training of the classifiers"""
+
         self.__keyword = keyword
         self.__like_threshold_min = like_threshold_min
         self.__like_threshold_max = like_threshold_max
+        self.__languages = languages
+        self.__near_duplicates = near_duplicates
+        self.__disabled_voters = disabled_voters
+        self.__cascade_margin = cascade_margin
+        self.__distilled = distilled
+        self.__tokenizer = tokenizer
 
     def get_data_from_DB(self):
         """Get the downloaded videos data from MongoDB using store module"""
@@ -55,19 +80,39 @@ class DataAnalysis:
         author = []
         comm_time = []
         comments = []
-        sentiment_val = []
-        confidence_val = []
-        sentiment_anew_arousal = []
+        comment_clusters = []
 
-        # get machine learning classifiers
+        # get the distilled classifier (fast mode) or the machine learning classifiers for the vote classifier
         tc = TrainClassifier()
-        classifiers = tc.get_classifiers(progress, console)
+        voted_classifier = None
+        classifier = tc.get_distilled_classifier() if self.__distilled else None
+
+        if classifier is not None:
+            console.append("> Classifying with the distilled classifier")
+        else:
+            if self.__distilled:
+                console.append("> The distilled classifier was not trained, classifying with the voting system")
+
+            classifiers = tc.get_classifiers(progress, console)
+
+            # vote classifier object
+            voted_classifier = VoteClassifier(classifiers, cascade_margin=self.__cascade_margin)
+            for name in self.__disabled_voters:
+                voted_classifier.set_enabled(name, False)
 
-        # vote classifier object
-        voted_classifier = VoteClassifier(classifiers)
+            classifier = voted_classifier
 
-        # process data object
-        pd = ProcessData()
+        # process data object, counting the words instead of keeping all the tokens
+        pd = ProcessData(count_words=True, tokenizer=self.__tokenizer)
+
+        # language detection object and number of comments per language
+        detector = LanguageDetector()
+        language_counts = Counter()
+
+        # duplicate detection object and the text and tokens of the first comment of each cluster
+        dedup = DuplicateDetector(self.__near_duplicates)
+        cluster_texts = []
+        cluster_tokens = []
 
         # get data
         videos_data = self.get_data_from_DB()
@@ -87,36 +132,85 @@ class DataAnalysis:
                 like = float(comment.get("nr_likes"))
 
                 if self.__like_threshold_min <= like <= self.__like_threshold_max:
-                    videos.append(video.get("title"))
-                    likes.append(like)
-                    author.append(comment.get("author"))
-                    comm_time.append(comment.get("time"))
-
-                    # get comments and apply filters
+                    # get comments and detect their language before the classifiers
                     comment_text = comment.get("text")
-                    comments.append(comment_text)
-                    pd.process_text(comment_text)
+                    language = detector.detect(comment_text)
+                    language_counts[language] += 1
+
+                    if self.__languages is None or language in self.__languages:
+                        videos.append(video.get("title"))
+                        likes.append(like)
+                        author.append(comment.get("author"))
+                        comm_time.append(comment.get("time"))
 
-                    # machine learning algorithms sentiment value with voting system
-                    ml_algorithms_sentiment = voted_classifier.classify(comment_text, pd)
-                    sentiment_val.append(ml_algorithms_sentiment)
+                        # apply filters
+                        comments.append(comment_text)
+                        pd.process_text(comment_text)
 
-                    # machine learning algorithms confidence value with voting system
-                    ml_algorithms_confidence = voted_classifier.confidence(comment_text, pd)
-                    confidence_val.append(ml_algorithms_confidence)
+                        # only the first comment of a cluster of copies is classified, the others reuse its results
+                        cluster, new = dedup.find(comment_text)
+                        comment_clusters.append(cluster)
 
-                    # get ANEW arousal values
-                    anew_result_arousal = anew.sentiment(pd.get_tokens())['arousal']
-                    sentiment_anew_arousal.append(anew_result_arousal)
+                        if new:
+                            cluster_texts.append(comment_text)
+                            cluster_tokens.append(list(pd.get_tokens()))
 
-                progress_value += 80 / nr_videos / nr_comments
+                progress_value += 40 / nr_videos / nr_comments
                 progress.setValue(progress_value)
 
-        if not pd.get_all_tokens():
+        # machine learning algorithms sentiment and confidence values with voting system, in batches
+        cluster_sentiment = []
+        cluster_confidence = []
+
+        for start in range(0, len(cluster_texts), CLASSIFY_BATCH_SIZE):
+            end = start + CLASSIFY_BATCH_SIZE
+            ml_algorithms_sentiment, ml_algorithms_confidence = \
+                classifier.classify_many(cluster_texts[start:end], cluster_tokens[start:end])
+            cluster_sentiment.extend(ml_algorithms_sentiment.tolist())
+            cluster_confidence.extend(ml_algorithms_confidence.tolist())
+
+            progress_value += 40 * len(ml_algorithms_sentiment) / len(cluster_texts)
+            progress.setValue(progress_value)
+
+        # report the cost of each voter
+        for name, weight, enabled, calls, nr_texts, elapsed, per_1k in \
+                (voted_classifier.get_stats() if voted_classifier else []):
+            if enabled:
+                console.append("> Voter %s (weight %g): %.1f ms per 1000 comments" % (name, weight, per_1k))
+        if voted_classifier and self.__cascade_margin is not None:
+            if voted_classifier.get_cascade_count():
+                console.append("> Cascade voting: %.1f%% of the comments decided by the cheap voters" %
+                               (100 * voted_classifier.get_early_exit_ratio()))
+            else:
+                console.append("> Cascade voting inactive (it needs both cheap and expensive enabled voters)")
+
+        # get ANEW arousal values
+        cluster_arousal = anew.batch_sentiment(cluster_tokens)['arousal'].tolist()
+
+        # every comment gets the results of its cluster
+        sentiment_val = [cluster_sentiment[cluster] for cluster in comment_clusters]
+        confidence_val = [cluster_confidence[cluster] for cluster in comment_clusters]
+        sentiment_anew_arousal = [cluster_arousal[cluster] for cluster in comment_clusters]
+
+        # report the languages of the comments
+        console.append("> Comments per language: " +
+                       ", ".join(language + " " + str(count) for language, count in language_counts.most_common()))
+        if self.__languages is not None:
+            skipped = sum(count for language, count in language_counts.items() if language not in self.__languages)
+            console.append("> " + str(skipped) + " comments skipped (language not in " +
+                           ", ".join(self.__languages) + ")")
+
+        # report the comments that were not classified again
+        console.append("> Duplicate comments: %.1f%% (%d comments classified)" %
+                       (100 * dedup.get_duplicate_ratio(), len(cluster_texts)))
+
+        word_counts = pd.get_word_counts()
+
+        if not word_counts:
             return
 
         # FreqDist returns a list of tuples containing each word and the number of its occurences
-        fd = FreqDist(pd.get_all_tokens())
+        fd = FreqDist(word_counts)
 
         # get the ending time and calculate elapsed time
         end_time = time.time()
@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+    Duplicate comments detection module
+    @alexandru_grigoras
+"""
+
+# Libraries
+import re
+
+import numpy as np
+
+# Constants
+__all__ = ['DuplicateDetector']
+__version__ = '1.0'
+__author__ = 'Alexandru Grigoras'
+__email__ = 'alex_grigoras_10@yahoo.com'
+__status__ = 'release'
+
+WORD_PATTERN = re.compile(r"\w+")
+NUM_HASHES = 16             # MinHash signature length
+BAND_ROWS = 4               # signature values per LSH band: texts sharing a band are compared
+SIMILARITY = 0.7            # min Jaccard similarity of the words of two near duplicates
+MIN_WORDS = 5               # shorter comments are only matched exactly
+PRIME = (1 << 61) - 1
+
+
+class DuplicateDetector:
+    """Groups copies of comments in clusters, so that only the first comment of a cluster (the representative) is
+        classified; the text is matched exactly by its hash, only with normalized whitespace (VADER scores the
+        capitals and the punctuation) and, optionally, near duplicates are matched by the Jaccard similarity of their
+        words (lowercase, no punctuation), with the candidates found by locality sensitive hashing of their MinHash
+        signatures"""
+
+    def __init__(self, near_duplicates=False, similarity=SIMILARITY):
+        """Class constructor
+            near_duplicates: also match comments with mostly the same words, not only the same normalized text
+            similarity: min Jaccard similarity (shared words / all words) of two near duplicates"""
+
+        self.__near_duplicates = near_duplicates
+        self.__similarity = similarity
+        self.__clusters = {}        # text with normalized whitespace -> cluster
+        self.__bands = {}           # (band, signature values of the band) -> [cluster]
+        self.__words = []           # words of each cluster representative, for the near duplicates
+        self.__nr_clusters = 0
+        self.__nr_texts = 0
+
+        # random hash functions (a * x + b) mod PRIME of the signature
+        random_state = np.random.RandomState(0)
+        self.__a = random_state.randint(1, 1 << 31, NUM_HASHES).astype(np.uint64)
+        self.__b = random_state.randint(0, 1 << 31, NUM_HASHES).astype(np.uint64)
+
+    def find(self, text):
+        """Returns the cluster of a text (numbered from 0 in the order of their representatives) and True if the
+            text is the representative of a new cluster"""
+
+        self.__nr_texts += 1
+
+        key = " ".join(text.split())
+
+        cluster = self.__clusters.get(key)
+        if cluster is not None:
+            return cluster, False
+
+        bands = None
+        words = None
+        if self.__near_duplicates:
+            # the near duplicates are compared by their words, without the case and the punctuation
+            words = frozenset(WORD_PATTERN.findall(text.lower()))
+            if len(words) >= MIN_WORDS:
+                bands = self.__signature_bands(words)
+                cluster = self.__find_near(words, bands)
+
+        new = cluster is None
+        if new:
+            cluster = self.__nr_clusters
+            self.__nr_clusters += 1
+            self.__words.append(words if bands is not None else None)
+            for band in bands or ():
+                self.__bands.setdefault(band, []).append(cluster)
+
+        self.__clusters[key] = cluster
+
+        return cluster, new
+
+    def get_duplicate_ratio(self):
+        """Returns the fraction of the texts that were duplicates of a previous one (work saved by the clusters)"""
+
+        if not self.__nr_texts:
+            return 0.0
+
+        return 1.0 - self.__nr_clusters / float(self.__nr_texts)
+
+    def __signature_bands(self, words):
+        """Returns the (band, signature values) keys of the MinHash signature of a set of words
+            The words are hashed with the built-in hash(), so signatures can only be compared in the same process"""
+
+        hashes = np.array([hash(word) & 0xFFFFFFFF for word in words], dtype=np.uint64)
+        signature = ((hashes[:, None] * self.__a + self.__b) % PRIME).min(axis=0)
+
+        return [(band, signature[band:band + BAND_ROWS].tobytes()) for band in range(0, NUM_HASHES, BAND_ROWS)]
+
+    def __find_near(self, words, bands):
+        """Returns the most similar cluster sharing a band with the words, None if none is similar enough"""
+
+        best = None
+        best_similarity = self.__similarity
+
+        for band in bands:
+            for cluster in self.__bands.get(band, ()):
+                other = self.__words[cluster]
+                similarity = len(words & other) / float(len(words | other))
+                if similarity >= best_similarity:
+                    best = cluster
+                    best_similarity = similarity
+
+        return best
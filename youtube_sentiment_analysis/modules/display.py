@@ -162,12 +162,11 @@ class DisplayData(FigureCanvas):
 
         self.draw()
 
-    def plot_wordcloud(self, tokens):
-        """Plot the wordcloud"""
+    def plot_wordcloud(self, word_counts):
+        """Plot the wordcloud from the number of occurrences of each word"""
 
         # Generate a word cloud image
-        plain_text = "".join([" " + i if not i.startswith("'") else i for i in tokens]).strip()
-        wordcloud = WordCloud(background_color="white", contour_color='steelblue').generate(plain_text)
+        wordcloud = WordCloud(background_color="white", contour_color='steelblue').generate_from_frequencies(word_counts)
         self.ax.imshow(wordcloud, interpolation='bilinear')
         self.ax.set_xticks([], [])
         self.ax.set_yticks([], [])
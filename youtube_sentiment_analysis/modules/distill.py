@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+    Distilled classifier
+    @alexandru_grigoras
+"""
+
+# Libraries
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+
+from youtube_sentiment_analysis.modules.process import ProcessData
+
+# Constants
+__all__ = ['DistilledClassifier']
+__version__ = '1.0'
+__author__ = 'Alexandru Grigoras'
+__email__ = 'alex_grigoras_10@yahoo.com'
+__status__ = 'release'
+
+N_FEATURES = 2 ** 18
+ALPHA = 1e-6
+MAX_ITER = 50
+
+
+class DistilledClassifier:
+    """Single sparse linear model trained to mimic the scores and the confidences of the voting system
+        (VoteClassifier), for a fast inference on the hashed word features of the filtered tokens"""
+
+    def __init__(self, n_features=N_FEATURES, alpha=ALPHA, max_iter=MAX_ITER):
+        """Class constructor
+            n_features: number of hashed word features
+            alpha: l2 regularization of the linear models
+            max_iter: max number of passes over the training data"""
+        self.__n_features = n_features
+        self.__score_model = SGDRegressor(alpha=alpha, max_iter=max_iter, tol=1e-4, random_state=0)
+        self.__confidence_model = SGDRegressor(alpha=alpha, max_iter=max_iter, tol=1e-4, random_state=0)
+
+    def fit(self, token_lists, scores, confidences):
+        """Train the linear models on the filtered tokens of texts and the scores and the confidences given them by
+            the voting system"""
+        features = ProcessData.vectorize(token_lists, n_features=self.__n_features)
+
+        self.__score_model.fit(features, scores)
+        self.__confidence_model.fit(features, confidences)
+
+        return self
+
+    def classify_many(self, texts, token_lists):
+        """Returns the mean values and the confidences mimicked for a batch of texts, as numpy arrays (same as
+            VoteClassifier.classify_many)"""
+        if not len(token_lists):
+            return np.zeros(0), np.zeros(0)
+
+        features = ProcessData.vectorize(token_lists, n_features=self.__n_features)
+
+        scores = np.clip(self.__score_model.predict(features), -1.0, 1.0)
+        confidences = np.clip(self.__confidence_model.predict(features), 0.5, 1.0)
+
+        return scores, confidences
+
+    def agreement(self, token_lists, scores):
+        """Returns the fraction of the texts getting the same label ('pos' for a score >= 0) from this classifier as
+            in the scores of the voting system, and the mean absolute difference of the scores"""
+        predicted, _ = self.classify_many(None, token_lists)
+
+        same = (predicted >= 0) == (np.asarray(scores) >= 0)
+
+        return same.mean(), np.abs(predicted - scores).mean()
@@ -100,6 +100,9 @@ class UIMainWindow(object):
         self.lineEditLikeMax = QtWidgets.QLineEdit(self.groupBoxComments)
         self.lineEditLikeMax.setGeometry(QtCore.QRect(230, 90, 81, 28))
         self.lineEditLikeMax.setObjectName("lineEditLikeMax")
+        self.checkBoxDistilled = QtWidgets.QCheckBox(self.groupBoxComments)
+        self.checkBoxDistilled.setGeometry(QtCore.QRect(30, 120, 281, 22))
+        self.checkBoxDistilled.setObjectName("checkBoxDistilled")
         self.groupBoxTraining = QtWidgets.QGroupBox(self.settings)
         self.groupBoxTraining.setGeometry(QtCore.QRect(30, 240, 601, 321))
         self.groupBoxTraining.setObjectName("groupBoxTraining")
@@ -115,6 +118,10 @@ class UIMainWindow(object):
         self.pushButtonTrain.setGeometry(QtCore.QRect(30, 160, 101, 31))
         self.pushButtonTrain.setObjectName("pushButtonTrain")
         self.pushButtonTrain.clicked.connect(self.__on_click_train)
+        self.pushButtonDistill = QtWidgets.QPushButton(self.groupBoxTraining)
+        self.pushButtonDistill.setGeometry(QtCore.QRect(150, 160, 101, 31))
+        self.pushButtonDistill.setObjectName("pushButtonDistill")
+        self.pushButtonDistill.clicked.connect(self.__on_click_distill)
         self.labelDatasetLimit = QtWidgets.QLabel(self.groupBoxTraining)
         self.labelDatasetLimit.setGeometry(QtCore.QRect(30, 100, 111, 31))
         self.labelDatasetLimit.setObjectName("labelDatasetLimit")
@@ -260,10 +267,12 @@ class UIMainWindow(object):
         self.labelLikeMax.setText(_translate("MainWindow", "Maximum number of likes:"))
         self.lineEditLikeMin.setText(_translate("MainWindow", "10"))
         self.lineEditLikeMax.setText(_translate("MainWindow", "1000"))
+        self.checkBoxDistilled.setText(_translate("MainWindow", "Fast mode (distilled classifier)"))
         self.lineEditDataset.setText(_translate("MainWindow", "/home/alex/imdb_data/"))
         self.groupBoxTraining.setTitle(_translate("MainWindow", "Training and Accuracy"))
         self.labelDataset.setText(_translate("MainWindow", "Dataset path:"))
         self.pushButtonTrain.setText(_translate("MainWindow", "Train"))
+        self.pushButtonDistill.setText(_translate("MainWindow", "Distill"))
         self.labelDatasetLimit.setText(_translate("MainWindow", "Limit documents:"))
         self.labelDatasetKfold.setText(_translate("MainWindow", "k-folds:"))
         self.pushButtonAccuracy.setText(_translate("MainWindow", "Accuracy"))
@@ -739,7 +748,8 @@ class UIMainWindow(object):
 
                 if crawling_result is True:
                     # process data
-                    data = DataAnalysis(input_text, like_threshold_min, like_threshold_max)
+                    data = DataAnalysis(input_text, like_threshold_min, like_threshold_max,
+                                        distilled=self.checkBoxDistilled.isChecked())
                     try:
                         fd, pd, sentiment_val, sentiment_anew_arousal, likes, confidence, comments, videos, author, \
                             comm_time = data.analyse(self.progressBar, self.textEditConsole)
@@ -767,7 +777,7 @@ class UIMainWindow(object):
                     self.word_frequency_display.plot_word_frequency(fd.items())
                     progress_value += 5
                     self.progressBar.setValue(progress_value)
-                    self.word_cloud_display.plot_wordcloud(pd.get_all_tokens())
+                    self.word_cloud_display.plot_wordcloud(pd.get_word_counts())
                     progress_value += 5
                     self.progressBar.setValue(progress_value)
 
@@ -815,7 +825,8 @@ class UIMainWindow(object):
                     return
 
                 # process data
-                data = DataAnalysis(input_text, like_threshold_min, like_threshold_max)
+                data = DataAnalysis(input_text, like_threshold_min, like_threshold_max,
+                                    distilled=self.checkBoxDistilled.isChecked())
                 try:
                     fd, pd, sentiment_val, sentiment_anew_arousal, likes, confidence, comments, videos, author, \
                         comm_time = data.analyse(self.progressBar, self.textEditConsole)
@@ -842,7 +853,7 @@ class UIMainWindow(object):
                 self.word_frequency_display.plot_word_frequency(fd.items())
                 progress_value += 5
                 self.progressBar.setValue(progress_value)
-                self.word_cloud_display.plot_wordcloud(pd.get_all_tokens())
+                self.word_cloud_display.plot_wordcloud(pd.get_word_counts())
                 progress_value += 5
                 self.progressBar.setValue(progress_value)
 
@@ -873,6 +884,26 @@ class UIMainWindow(object):
         train_classifier = TrainClassifier(dataset_path, max_nr_docs)
         train_classifier.train(self.progressBar, self.textEditConsole)
 
+    @pyqtSlot(name="distill")
+    def __on_click_distill(self):
+        """Train the distilled classifier (fast mode) mimicking the voting system"""
+
+        try:
+            max_nr_docs = int(self.lineEditDatasetLimit.text())
+
+            if max_nr_docs < 1:
+                self.textEditConsole.append("> The maximum number of documents should be positive")
+                return
+
+        except ValueError:
+            self.textEditConsole.append("> The maximum number of documents is not valid")
+            return
+
+        dataset_path = self.lineEditDataset.text()
+
+        train_classifier = TrainClassifier(dataset_path, max_nr_docs)
+        train_classifier.distill(self.progressBar, self.textEditConsole)
+
     @pyqtSlot(name="accuracy")
     def __on_click_accuracy(self):
         """Test the accuracy of the classifiers"""
@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+    Language detection module
+    @alexandru_grigoras
+"""
+
+# Libraries
+import bisect
+import re
+from collections import Counter
+
+# Constants
+__all__ = ['LanguageDetector']
+__version__ = '1.0'
+__author__ = 'Alexandru Grigoras'
+__email__ = 'alex_grigoras_10@yahoo.com'
+__status__ = 'release'
+
+UNDETERMINED = 'und'
+MAX_WORDS = 50
+MIN_VOTES = 2               # function words needed to tag a latin text with another language than english
+MIN_MARGIN = 2              # function words of the other language more than the english ones
+
+# unicode blocks of the non latin scripts: (first code point, last code point, language tagged for the script)
+SCRIPTS = [
+    (0x0370, 0x03FF, 'el'),     # greek
+    (0x0400, 0x052F, 'ru'),     # cyrillic
+    (0x0590, 0x05FF, 'he'),     # hebrew
+    (0x0600, 0x06FF, 'ar'),     # arabic
+    (0x0750, 0x077F, 'ar'),     # arabic supplement
+    (0x0900, 0x097F, 'hi'),     # devanagari
+    (0x0980, 0x09FF, 'bn'),     # bengali
+    (0x0B80, 0x0BFF, 'ta'),     # tamil
+    (0x0E00, 0x0E7F, 'th'),     # thai
+    (0x1100, 0x11FF, 'ko'),     # hangul jamo
+    (0x3040, 0x30FF, 'ja'),     # hiragana and katakana
+    (0x4E00, 0x9FFF, 'zh'),     # cjk ideographs (also used by japanese)
+    (0xAC00, 0xD7AF, 'ko'),     # hangul syllables
+]
+
+# bundled model of the latin script languages: their most frequent function words
+FUNCTION_WORDS = {
+    'en': "the and is are was were you that this it of to in for with not have has but what his her they she he "
+          "my your be been me we our just very so a an i i'm it's no on at as or if do don't all can will would "
+          "from by about out up one how who there them their come u ur im dont",
+    'es': "el la los las que de y en un una por con para es está no lo muy pero más como su al del se le esto eso "
+          "yo tú también porque esta este mi me",
+    'fr': "le la les des est et un une que qui pas pour dans ce cette sur avec je tu il elle nous vous mais très ne "
+          "du au c'est",
+    'de': "der die das und ist nicht ein eine ich du er sie es mit auf für den dem zu von sehr aber auch wie was "
+          "sind war",
+    'pt': "o a os as que de e não um uma com para por é muito mais mas se eu você isso está do da no na essa esse "
+          "meu minha",
+    'it': "il lo la gli le che di e non un una è per con sono questo molto ma anche come del della io tu",
+    'nl': "de het een en is niet van ik je dat die op te met voor zijn maar ook wat heel",
+    'ro': "și este nu un o în pe că de la cu pentru mai foarte dar ce eu tu asta sunt",
+    'id': "yang dan ini itu di ke dari tidak ada saya aku kamu dengan untuk sangat juga bisa",
+    'tr': "ve bir bu da de için çok ne ben sen değil ama gibi var mı",
+}
+
+
+class LanguageDetector:
+    """Cheap language detection of comments, before the (english only) tokenization and classifiers
+        The script of the letters tags the non latin texts, the function words of the bundled model tag the latin
+        ones; latin texts are taken as english unless another language has clearly more function words (short
+        words like "a", "no" or "de" are shared by many languages)"""
+
+    def __init__(self, max_words=MAX_WORDS):
+        """Class constructor
+            max_words: number of words of a latin text looked up in the model"""
+
+        self.__max_words = max_words
+        self.__word_pattern = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+        self.__starts = [start for start, _, _ in SCRIPTS]
+
+        # word -> languages using it
+        self.__model = {}
+        for language, words in FUNCTION_WORDS.items():
+            for word in words.split():
+                self.__model.setdefault(word, []).append(language)
+
+    def detect(self, text):
+        """Returns the language code of a text ('und' when it has no letters)"""
+
+        if text.isascii():
+            return self.__detect_latin(text)
+
+        scripts = Counter()
+        for char in text:
+            if not char.isalpha():
+                continue
+
+            code = ord(char)
+            if code < 0x0250 or 0x1E00 <= code <= 0x1EFF:
+                scripts['latin'] += 1
+            else:
+                index = bisect.bisect_right(self.__starts, code) - 1
+                if index >= 0 and code <= SCRIPTS[index][1]:
+                    scripts[SCRIPTS[index][2]] += 1
+                else:
+                    scripts[UNDETERMINED] += 1
+
+        if not scripts:
+            return UNDETERMINED
+
+        script = scripts.most_common(1)[0][0]
+        if script == 'latin':
+            return self.__detect_latin(text)
+        elif script == 'zh' and scripts['ja']:
+            # japanese mixes the cjk ideographs with kana
+            return 'ja'
+        else:
+            return script
+
+    def __detect_latin(self, text):
+        """Returns the language of a latin script text, from the function words of the model"""
+
+        words = self.__word_pattern.findall(text.lower().replace("\u2019", "'"))
+        if not words:
+            return UNDETERMINED
+
+        votes = Counter()
+        for word in words[:self.__max_words]:
+            votes.update(self.__model.get(word, ()))
+
+        # english wins unless another language has enough votes, clearly more than english
+        english = votes.pop('en', 0)
+        if not votes:
+            return 'en'
+
+        language, best = votes.most_common(1)[0]
+        if best < MIN_VOTES or best - english < MIN_MARGIN:
+            return 'en'
+
+        return language
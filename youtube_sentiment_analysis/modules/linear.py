@@ -0,0 +1,107 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+    Exported linear classifiers
+    @alexandru_grigoras
+"""
+
+# Libraries
+import numpy as np
+from scipy import sparse
+
+# Constants
+__all__ = ['LinearScorer']
+__version__ = '1.0'
+__author__ = 'Alexandru Grigoras'
+__email__ = 'alex_grigoras_10@yahoo.com'
+__status__ = 'release'
+
+LINEAR_ESTIMATORS = ('LogisticRegression', 'MultinomialNB', 'SVC', 'NuSVC')
+SVM_MIN_PROB = 1e-7                 # libsvm clips the probabilities to [min_prob, 1 - min_prob]
+
+
+class LinearScorer:
+    """Weights and vocabulary exported from a trained linear classifier (logistic regression, multinomial naive bayes
+        or a linear kernel SVM with probabilities), without nltk and sklearn; the probability of 'pos' is the logistic
+        sigmoid of one weighted sum of the word features:
+            logistic regression: the decision function
+            multinomial naive bayes: the difference of the class log probabilities
+            SVM: the decision function scaled by the Platt sigmoid (probA_, probB_) folded in the weights"""
+
+    def __init__(self, estimator, vocabulary, coef, intercept, min_prob=0.0):
+        """Class constructor
+            estimator: name of the sklearn estimator (e.g. NuSVC)
+            vocabulary: word -> feature column
+            coef: weight of each feature column in the log odds of 'pos'
+            intercept: log odds of 'pos' without features
+            min_prob: the probabilities are clipped to [min_prob, 1 - min_prob]"""
+        self.estimator = estimator
+        self.__vocabulary = vocabulary
+        self.__coef = np.asarray(coef, dtype=float)
+        self.__intercept = float(intercept)
+        self.__min_prob = float(min_prob)
+
+    @classmethod
+    def from_classifier(cls, classifier):
+        """Returns the scorer of a trained nltk SklearnClassifier, None if its estimator is not linear"""
+        clf = classifier._clf
+        estimator = type(clf).__name__
+
+        if estimator not in LINEAR_ESTIMATORS or len(clf.classes_) != 2:
+            return None
+
+        # only the linear kernel has a weight per feature
+        if getattr(clf, 'kernel', 'linear') != 'linear':
+            return None
+
+        min_prob = 0.0
+        if estimator == 'MultinomialNB':
+            # the probabilities are normalized over the two classes: p1 = sigmoid(jll1 - jll0)
+            coef = clf.feature_log_prob_[1] - clf.feature_log_prob_[0]
+            intercept = clf.class_log_prior_[1] - clf.class_log_prior_[0]
+        elif estimator in ('SVC', 'NuSVC'):
+            if not clf.probability:
+                return None
+
+            # libsvm: p0 = 1 / (1 + exp(A * dec + B)), its decision value dec is the opposite of sklearn's
+            coef = clf.coef_.toarray()[0] if sparse.issparse(clf.coef_) else clf.coef_[0]
+            coef = -clf.probA_[0] * coef
+            intercept = -clf.probA_[0] * clf.intercept_[0] + clf.probB_[0]
+            min_prob = SVM_MIN_PROB
+        else:
+            coef = clf.coef_[0]
+            intercept = clf.intercept_[0]
+
+        # log odds of 'pos' instead of the second class
+        if list(classifier._encoder.classes_).index('pos') == 0:
+            coef = -coef
+            intercept = -intercept
+
+        return cls(estimator, dict(classifier._vectorizer.vocabulary_), coef, intercept, min_prob)
+
+    @classmethod
+    def load(cls, file_path):
+        """Returns the scorer saved in a numpy .npz file"""
+        with np.load(file_path, allow_pickle=False) as data:
+            words = data['words'].tolist()
+            return cls(str(data['estimator']), dict(zip(words, range(len(words)))), data['coef'],
+                       data['intercept'], data['min_prob'])
+
+    def save(self, file_path):
+        """Save the weights and the vocabulary (words ordered by feature column) in a compressed numpy .npz file"""
+        words = sorted(self.__vocabulary, key=self.__vocabulary.get)
+
+        np.savez_compressed(file_path, estimator=self.estimator, words=np.array(words, dtype=str), coef=self.__coef,
+                            intercept=self.__intercept, min_prob=self.__min_prob)
+
+    def get_vocabulary(self):
+        """Returns the vocabulary (word -> feature column), see ProcessData.vectorize"""
+        return self.__vocabulary
+
+    def score_many(self, features):
+        """Returns the probabilities of 'pos' minus those of 'neg' for a features matrix (one row per text), with one
+            sparse matrix-vector product: 2 * sigmoid(z) - 1 = tanh(z / 2)"""
+        log_odds = features.dot(self.__coef) + self.__intercept
+        limit = 1.0 - 2 * self.__min_prob
+
+        return np.clip(np.tanh(log_odds / 2), -limit, limit)
@@ -6,40 +6,288 @@
 """
 
 # Libraries
+import functools
+import heapq
+import itertools
 import re
+import time
+from collections import Counter
+
+import numpy as np
 from nltk.corpus import stopwords
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction import FeatureHasher
+
+from youtube_sentiment_analysis.modules.sentiment_module import sentiment as anew
 
 # Constants
-__all__ = ['ProcessData']
+__all__ = ['ProcessData', 'Tokenizer', 'WordCounter']
 __version__ = '1.0'
 __author__ = 'Alexandru Grigoras'
 __email__ = 'alex_grigoras_10@yahoo.com'
 __status__ = 'release'
 
+CUSTOM_STOPWORDS = []
+LINK_PREFIXES = ('http', 'www')
+# whole emoji sequences: flags (pairs of regional indicators), then pictographs, symbols and dingbats with an optional
+# skin tone modifier or variation selector, joined by zero width joiners (families, professions)
+EMOJI_PART = r"[\U0001F1E6-\U0001F1FF\U0001F300-\U0001FAFF\u2600-\u27BF](?:[\U0001F3FB-\U0001F3FF]|\uFE0F)?"
+EMOJI = r"[\U0001F1E6-\U0001F1FF]{2}|%s(?:\u200d%s)*" % (EMOJI_PART, EMOJI_PART)
+# word features: letters with apostrophes inside (contractions) or an emoji, other tokens are the empty feature
+WORD_PATTERN = re.compile(r"^(?:[^\W\d]+(?:'[^\W\d]+)*|%s)?$" % EMOJI)
+N_FEATURES = 2 ** 20
+
+
+class WordCounter:
+    """Word counter with bounded memory that keeps the max_words most frequent words (Space-Saving algorithm)
+        The count of a kept word is over-estimated by at most the count of the word it replaced"""
+
+    def __init__(self, max_words):
+        """Class constructor"""
+
+        self.__max_words = max_words
+        self.__counts = {}
+        self.__heap = []            # one (count, word) entry per kept word, count may be stale (lower)
+
+    def update(self, words):
+        """Count the words"""
+
+        counts = self.__counts
+        heap = self.__heap
+
+        for word in words:
+            if word in counts:
+                counts[word] += 1
+            elif len(counts) < self.__max_words:
+                counts[word] = 1
+                heapq.heappush(heap, (1, word))
+            elif self.__max_words > 0:
+                # replace the least frequent word, refreshing stale heap entries on the way
+                count, old_word = heapq.heappop(heap)
+                while counts[old_word] != count:
+                    count, old_word = heapq.heappushpop(heap, (counts[old_word], old_word))
+
+                del counts[old_word]
+                counts[word] = count + 1
+                heapq.heappush(heap, (count + 1, word))
+
+    def get_counts(self):
+        """Returns the counts of the kept words"""
+
+        return Counter(self.__counts)
+
+
+class Tokenizer:
+    """Comment tokenizer keeping only the words and emoji: the text is split at whitespace and only the parts that
+        are not plain words go through one compiled regular expression, where links, mentions, hashtags, numbers and
+        punctuation are matched too but not captured (ascii parts take a faster pattern without the unicode letters
+        and emoji); elongated words are mapped to a known word"""
+
+    # links, mentions and hashtags before the words, words mixed with digits or underscores after them
+    __LINK = r"(?:https?://|www\.)\S+|[#@+]\w+"
+    __OTHER = r"\w+"
+    # ascii words with apostrophes inside (contractions: don't, you're)
+    __ASCII_WORD = r"[a-z]+(?:'[a-z]+)*"
+    # unicode letters (no digits or underscore) with apostrophes inside
+    __UNICODE_WORD = r"[^\W\d_]+(?:'[^\W\d_]+)*"
+    # three or more repeated characters (soooo, gooood)
+    __ELONGATED = re.compile(r"(.)\1\1+")
+    # punctuation around the plain words
+    __PUNCTUATION = ".,!?:;()\""
+    __MAX_SHORTENED = 10000
+
+    def __init__(self, emoji=True, elongated=True, contractions=True, min_length=3, vocabulary=None):
+        """Class constructor
+            emoji: keep emoji as tokens
+            elongated: map the words with characters repeated more than twice to a known word, with the repeated
+                characters shortened to two (goooood -> good) if it is known, otherwise to one (looooove -> love)
+            contractions: keep contractions as one token (don't), otherwise they are split at the apostrophe
+            min_length: minimum length of the word tokens (emoji are always kept)
+            vocabulary: known words for the elongated words (e.g. the vocabulary of a classifier), by default the
+                words of the ANEW and Happiness lexicon"""
+
+        ascii_word = self.__ASCII_WORD if contractions else r"[a-z]+"
+        unicode_word = self.__UNICODE_WORD if contractions else r"[^\W\d_]+"
+        emoji_token = "|" + EMOJI if emoji else ""
+
+        # the words (and emoji) are the only captured group, every other match is found as an empty string
+        self.__ascii_pattern = re.compile(r"%s|(%s(?!\w))|%s" % (self.__LINK, ascii_word, self.__OTHER), re.ASCII)
+        self.__unicode_pattern = re.compile(r"%s|(%s(?!\w)%s)|%s"
+                                            % (self.__LINK, unicode_word, emoji_token, self.__OTHER))
+
+        self.__elongated = elongated
+        self.__min_length = min_length
+        self.__vocabulary = vocabulary
+        self.__shortened = {}
+
+    def tokenize(self, text, stopwords_set=frozenset()):
+        """Returns the lowercase words and emoji of a text, without the stopwords"""
+
+        text = text.lower()
+        if not text.isascii():
+            text = text.replace("\u2019", "'")
+
+        elongated = self.__elongated and self.__ELONGATED.search(text)
+        shortened = self.__shortened
+        punctuation = self.__PUNCTUATION
+        min_length = self.__min_length
+
+        # plain words, also with punctuation around them, are filtered as they are, only the other parts are matched
+        # by the pattern
+        tokens = []
+        append = tokens.append
+        for part in text.split():
+            if not part.isalpha():
+                word = part.strip(punctuation)
+                if not word.isalpha():
+                    words = (self.__ascii_pattern if part.isascii() else self.__unicode_pattern).findall(part)
+                    if elongated:
+                        words = [shortened.get(w) or self.__shorten(w) for w in words]
+                    # emoji are the only tokens that are not letters
+                    tokens += [w for w in words
+                               if w
+                               and (len(w) >= min_length or not w.isalpha())
+                               and w not in stopwords_set]
+                    continue
+                part = word
+
+            if elongated:
+                part = shortened.get(part) or self.__shorten(part)
+            if len(part) >= min_length and part not in stopwords_set:
+                append(part)
+
+        return tokens
+
+    def __shorten(self, word):
+        """Returns the known word of an elongated word: its repeated characters shortened to two if that is a known
+            word, otherwise to one (the other words are returned as they are)"""
+
+        if self.__ELONGATED.search(word):
+            shortened = self.__ELONGATED.sub(r"\1\1", word)
+            if self.__vocabulary is None:
+                exist = anew.exist(shortened)
+            else:
+                exist = shortened in self.__vocabulary
+            known = shortened if exist else self.__ELONGATED.sub(r"\1", word)
+        else:
+            known = word
+
+        # bounded memo of the words seen in elongated texts
+        if len(self.__shortened) < self.__MAX_SHORTENED:
+            self.__shortened[word] = known
+
+        return known
+
+    def benchmark(self, texts, repeat=3):
+        """Returns the tokens per second of ProcessData.tokenize on the texts with this tokenizer ('tokenizer') and
+            with the default whitespace split ('split'), best of repeat runs"""
+
+        texts = list(texts)
+        speed = {}
+
+        for name, tokenizer in (('split', None), ('tokenizer', self)):
+            best = None
+            count = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                count = sum(len(ProcessData.tokenize(text, tokenizer)) for text in texts)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            speed[name] = count / best if best else 0.0
+
+        return speed
+
 
 class ProcessData:
     """Class for pre-processing the the for the analysis module"""
 
-    def __init__(self):
-        """Class constructor"""
+    # stopwords set shared by all instances, loaded on first use
+    __stopwords = None
 
+    def __init__(self, count_words=False, max_words=None, tokenizer=None):
+        """Class constructor
+            count_words: count the words of all processed texts instead of keeping every token (get_all_tokens)
+            max_words: with count_words, keep only the max_words most frequent words in bounded memory
+            tokenizer: Tokenizer for the texts, by default they are split at whitespace"""
+
+        self.__tokenizer = tokenizer
         self.__all_tokens = []
         self.__tokens = []
+        self.__word_feature = None
+
+        if not count_words:
+            self.__word_counter = None
+        elif max_words is None:
+            self.__word_counter = Counter()
+        else:
+            self.__word_counter = WordCounter(max_words)
 
     def process_text(self, text):
         """Process the text by filtering it and removing unwanted characters"""
 
         self.__tokens.clear()
+        self.__word_feature = None
+
+        filtered_tokens = self.tokenize(text, self.__tokenizer)
+
+        self.__tokens.extend(filtered_tokens)
+
+        if self.__word_counter is None:
+            self.__all_tokens.extend(filtered_tokens)
+        else:
+            self.__word_counter.update(filtered_tokens)
+
+    @classmethod
+    def tokenize(cls, text, tokenizer=None):
+        """Returns the filtered tokens of a text, without changing the state of the object
+            tokenizer: Tokenizer for the text, by default it is split at whitespace"""
+
+        if tokenizer is not None:
+            return tokenizer.tokenize(text, cls.__get_stopwords())
 
         tokenize = [t.lower().strip(":,.!?") for t in text.split()]
 
-        filtered_tokens = self.__filter_text(tokenize)
+        return cls.__filter_text(tokenize)
 
-        self.__tokens.extend(filtered_tokens)
-        self.__all_tokens.extend(filtered_tokens)
+    @classmethod
+    def process_many(cls, texts, tokenizer=None):
+        """Generator that yields the (tokens, word features) of each text; stateless, unlike process_text"""
 
-    @staticmethod
-    def __filter_text(tokens):
+        for text in texts:
+            tokens = cls.tokenize(text, tokenizer)
+            yield tokens, cls.__word_features(tokens)
+
+    @classmethod
+    def process_chunk(cls, texts, tokenizer=None):
+        """Returns the list of (tokens, word features) of a chunk of texts, as a work unit for a process pool"""
+
+        return list(cls.process_many(texts, tokenizer))
+
+    @classmethod
+    def process_chunks(cls, texts, chunk_size=1000, pool=None, tokenizer=None):
+        """Generator that yields the (tokens, word features) of each text, processing the texts in chunks
+            mapped over a process pool (e.g. multiprocessing.Pool) if given, in the order of the texts"""
+
+        texts = iter(texts)
+        chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+
+        process_chunk = functools.partial(cls.process_chunk, tokenizer=tokenizer)
+        results = pool.imap(process_chunk, chunks) if pool else map(process_chunk, chunks)
+
+        for chunk in results:
+            yield from chunk
+
+    @classmethod
+    def __get_stopwords(cls):
+        """Returns the english and custom stopwords as a frozenset, reading the nltk corpus only once"""
+
+        if cls.__stopwords is None:
+            cls.__stopwords = frozenset(stopwords.words('english')) | frozenset(CUSTOM_STOPWORDS)
+
+        return cls.__stopwords
+
+    @classmethod
+    def __filter_text(cls, tokens):
         """Pre-process comments to remove irrelevant data
             Takes in a string of text, then performs the following:
             1. Remove all punctuation
@@ -47,30 +295,23 @@ class ProcessData:
             3. Remove other characters
             4. Return the cleaned text as a list of words"""
 
-        stopwords_english = stopwords.words('english')
-        custom_stopwords = []
+        stopwords_english = cls.__get_stopwords()
 
-        hashtags = [w for w in tokens if w.startswith('#')]
-        ghashtags = [w for w in tokens if w.startswith('+')]
-        mentions = [w for w in tokens if w.startswith('@')]
-        links = [w for w in tokens if w.startswith('http') or w.startswith('www')]
+        # single pass: hashtags (#, +) and mentions (@) already fail isalpha(), links are matched by prefix
         filtered_tokens = [w for w in tokens
-                           if w not in stopwords_english
-                           and w not in custom_stopwords
-                           and w.isalpha()
-                           and not len(w) < 3
-                           and w not in hashtags
-                           and w not in ghashtags
-                           and w not in links
-                           and w not in mentions]
+                           if w.isalpha()
+                           and len(w) >= 3
+                           and w not in stopwords_english
+                           and not w.startswith(LINK_PREFIXES)]
 
         return filtered_tokens
 
     @staticmethod
+    @functools.lru_cache(maxsize=65536)
     def __word_verify(word):
-        """Check if the word contains only letters"""
+        """Check if the word contains only letters (memoized, words repeat across comments)"""
 
-        if re.match("^[a-zA-Z_]*$", word):
+        if WORD_PATTERN.match(word):
             return word.lower()
         else:
             return ''
@@ -81,11 +322,66 @@ class ProcessData:
         return self.__tokens
 
     def get_all_tokens(self):
-        """Returns all the filtered tokens"""
+        """Returns all the filtered tokens (empty when counting words)"""
 
         return self.__all_tokens
 
+    def get_word_counts(self):
+        """Returns a Counter with the number of occurrences of each word in all the filtered tokens"""
+
+        if self.__word_counter is None:
+            return Counter(self.__all_tokens)
+        elif isinstance(self.__word_counter, WordCounter):
+            return self.__word_counter.get_counts()
+        else:
+            return Counter(self.__word_counter)
+
+    @classmethod
+    def __word_features(cls, tokens):
+        """Returns the word features dictionary of a list of tokens"""
+
+        return dict.fromkeys(map(cls.__word_verify, tokens), True)
+
+    @staticmethod
+    def __feature_matrix(features, vocabulary, n_features):
+        """Returns the CSR matrix of a list of word features dictionaries"""
+
+        if vocabulary is None:
+            hasher = FeatureHasher(n_features=n_features, input_type='string', alternate_sign=False)
+            return hasher.transform(features)
+
+        indices = []
+        indptr = [0]
+        for feature in features:
+            indices.extend([vocabulary[word] for word in feature if word in vocabulary])
+            indptr.append(len(indices))
+
+        return csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(features), len(vocabulary)))
+
+    @classmethod
+    def vectorize(cls, token_lists, vocabulary=None, n_features=N_FEATURES):
+        """Returns a scipy CSR matrix with one row of word features (same keys as get_word_feature) per list of
+            tokens, to be fed directly to sklearn estimators; the columns come from a frozen vocabulary
+            (word -> column, see TrainClassifier.get_vocabulary) or, without one, from hashing the words"""
+
+        features = [cls.__word_features(tokens) for tokens in token_lists]
+
+        return cls.__feature_matrix(features, vocabulary, n_features)
+
+    def get_feature_vector(self, vocabulary=None, n_features=N_FEATURES):
+        """Returns the word features of the current text as a one row scipy CSR matrix (see vectorize)"""
+
+        return self.__feature_matrix([self.get_word_feature()], vocabulary, n_features)
+
     def get_word_feature(self, tokens=None):
-        """Get the word features from dictionary"""
-        
-        return dict([(self.__word_verify(word), True) for word in (tokens if tokens else self.__tokens)])
+        """Get the word features from dictionary
+            The features of the current text are computed once per process_text call and the same dictionary
+            is returned on every call, so it should not be modified"""
+
+        if tokens:
+            return self.__word_features(tokens)
+
+        if self.__word_feature is None:
+            self.__word_feature = self.__word_features(self.__tokens)
+
+        return self.__word_feature
@@ -0,0 +1,308 @@
+#!/usr/bin/python
+
+#- LEXICON.PY --------------------------------------------------------------#
+#  Compiled, array-backed form of the ANEW and Happiness dictionaries from	#
+#  SENTIMENT_TERM.PY, memory-mapped at load by SENTIMENT.PY					#
+#																			#
+#  File layout (little-endian):												#
+#    header   magic, SHA-1 digest of SENTIMENT_TERM.PY, row count,			#
+#             table count, array count, blob offset, blob size				#
+#    tables   16-byte name, first row, row count (terms sorted per table)	#
+#    arrays   16-byte name, offset of a float32 [ rows x 2 ] array			#
+#             (avg, std, Gaussian weight wt and weight x avg wmu)			#
+#    blob     UTF-8 terms of all tables, one per line, in row order			#
+#																			#
+#  A lexicon is read from a memory-mapped file (pages shared by all			#
+#  processes mapping it) or from a multiprocessing shared memory block		#
+#  created by Lexicon.share() and attached to by scoring workers			#
+#---------------------------------------------------------------------------#
+
+import atexit
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+import numpy as np
+
+__all__ = ['Lexicon', 'compile_lexicon', 'weight', 'LEXICON_PATH']
+
+LEXICON_PATH = os.path.join( os.path.dirname( __file__ ), 'sentiment_term.lex' )
+LEXICON_TABLES = [ 'anew_word', 'anew_stem', 'hapi_word' ]
+SOURCE_PATH = os.path.join( os.path.dirname( __file__ ), 'sentiment_term.py' )
+
+_MAGIC = b'LEX3'
+_HEADER = struct.Struct( '<4s20sIIIII' )
+_TABLE = struct.Struct( '<16sII' )
+_ARRAY = struct.Struct( '<16sI' )
+
+
+def _pack_array( values ):
+
+#  Return little-endian float32 bytes for a flat list of values
+#
+#  values:  List of floats
+
+	return struct.pack( '<%df' % len( values ), *values )
+
+#  End function _pack_array
+
+
+def _source_digest( path = SOURCE_PATH ):
+
+#  Return the SHA-1 digest of the raw term dictionaries module, stored in
+#  the compiled lexicon to detect a stale file; None if the module is not
+#  there (e.g., only the compiled lexicon was installed)
+#
+#  path:  Raw term dictionaries module
+
+	if not os.path.exists( path ):
+		return None
+
+	with open( path, 'rb' ) as f:
+		return hashlib.sha1( f.read() ).digest()
+
+#  End function _source_digest
+
+
+def compile_lexicon( path = LEXICON_PATH ):
+
+#  Build the compiled lexicon from the raw term dictionaries and write
+#  it to a file; returns the compiled bytes
+#
+#  path:  File to write, None to only return the bytes
+
+	from . import sentiment_term
+
+	terms = [ ]
+	tables = [ ]
+	avg = [ ]
+	std = [ ]
+	wt = [ ]
+	wmu = [ ]
+
+	for name in LEXICON_TABLES:
+		table = getattr( sentiment_term, name )
+		tables.append( ( name, len( terms ), len( table ) ) )
+
+		for term in sorted( table ):
+			terms.append( term )
+			avg.extend( table[ term ][ 'avg' ] )
+			std.extend( table[ term ][ 'std' ] )
+
+			w = weight( table[ term ][ 'avg' ], table[ term ][ 'std' ] )
+			wt.extend( w[ 0 ] )
+			wmu.extend( w[ 1 ] )
+
+	arrays = [ ( 'avg', _pack_array( avg ) ), ( 'std', _pack_array( std ) ),
+	           ( 'wt', _pack_array( wt ) ), ( 'wmu', _pack_array( wmu ) ) ]
+
+	blob = '\n'.join( terms ).encode( 'utf-8' )
+	blob_off = _HEADER.size + _TABLE.size * len( tables ) +\
+	           _ARRAY.size * len( arrays )
+
+	#  Keep the float arrays 4-byte aligned after the term blob
+
+	off = blob_off + len( blob ) + ( -( blob_off + len( blob ) ) % 4 )
+
+	digest = _source_digest() or b''
+
+	data = bytearray( _HEADER.pack( _MAGIC, digest, len( terms ), len( tables ),
+	                                len( arrays ), blob_off, len( blob ) ) )
+	for name, start, count in tables:
+		data += _TABLE.pack( name.encode( 'ascii' ), start, count )
+	for name, values in arrays:
+		data += _ARRAY.pack( name.encode( 'ascii' ), off )
+		off = off + len( values )
+
+	data += blob
+	data += b'\0' * ( -len( data ) % 4 )
+	for name, values in arrays:
+		data += values
+
+	if path is not None:
+		with open( path, 'wb' ) as f:
+			f.write( data )
+
+	return bytes( data )
+
+#  End function compile_lexicon
+
+
+def weight( avg, std ):
+
+#  Return the Gaussian weights [ wt, wmu ] of a term, where wt is
+#  1 / sqrt( 2 pi std^2 ) and wmu is wt * avg, each as [ valence, arousal ]
+#
+#  avg:  Average [ valence, arousal ]
+#  std:  Standard deviation [ valence, arousal ]
+
+	c = 2.0 * math.pi
+
+	wt = [ 1.0 / math.sqrt( c * math.pow( sd, 2.0 ) ) for sd in std ]
+	wmu = [ w * mu for w, mu in zip( wt, avg ) ]
+
+	return [ wt, wmu ]
+
+#  End function weight
+
+
+class Lexicon:
+
+#  Read-only view of a compiled lexicon; every table maps a term to a
+#  row of the shared avg/std arrays (column 0 valence, column 1 arousal)
+
+	def __init__( self, buf ):
+
+	#  buf:  Buffer holding the compiled lexicon (bytes, mmap, ...)
+
+		magic, digest, rows, n_tables, n_arrays, blob_off, blob_size =\
+		  _HEADER.unpack_from( buf, 0 )
+		if magic != _MAGIC:
+			raise ValueError( 'Not a compiled sentiment lexicon' )
+
+		self.buf = buf
+		self.rows = rows
+		self.shm = None							# Shared memory block, see attach()
+
+		terms = bytes( buf[ blob_off: blob_off + blob_size ] ).decode( 'utf-8' )
+		terms = terms.split( '\n' ) if rows > 0 else [ ]
+
+		off = _HEADER.size
+		self.tables = { }
+		for i in range( 0, n_tables ):
+			name, start, count = _TABLE.unpack_from( buf, off )
+			name = name.rstrip( b'\0' ).decode( 'ascii' )
+			self.tables[ name ] = dict( zip( terms[ start: start + count ],
+			                                 range( start, start + count ) ) )
+			off = off + _TABLE.size
+
+		self.arrays = { }
+		self.offsets = { }
+		for i in range( 0, n_arrays ):
+			name, arr_off = _ARRAY.unpack_from( buf, off )
+			name = name.rstrip( b'\0' ).decode( 'ascii' )
+			self.offsets[ name ] = arr_off
+			self.arrays[ name ] = np.frombuffer(
+			  buf, dtype = '<f4', count = rows * 2, offset = arr_off
+			).reshape( rows, 2 )
+			off = off + _ARRAY.size
+
+		self.avg = self.arrays[ 'avg' ]
+		self.std = self.arrays[ 'std' ]
+		self.wt = self.arrays[ 'wt' ]
+		self.wmu = self.arrays[ 'wmu' ]
+
+	@classmethod
+	def load( cls, path = LEXICON_PATH ):
+
+	#  Memory-map a compiled lexicon file, compiling it first from the
+	#  raw term dictionaries if it does not exist yet, was compiled by an
+	#  older version or from another version of the raw term dictionaries
+	#
+	#  path:  Compiled lexicon file
+
+		stale = True
+		if os.path.exists( path ):
+			with open( path, 'rb' ) as f:
+				header = f.read( _HEADER.size )
+
+			if len( header ) == _HEADER.size and header[ :len( _MAGIC ) ] == _MAGIC:
+				digest = _source_digest()
+				stale = digest is not None and _HEADER.unpack( header )[ 1 ] != digest
+
+		if stale:
+			try:
+				compile_lexicon( path )
+			except OSError:
+				return cls( compile_lexicon( None ) )
+
+		with open( path, 'rb' ) as f:
+			buf = mmap.mmap( f.fileno(), 0, access = mmap.ACCESS_READ )
+
+		return cls( buf )
+
+	@classmethod
+	def attach( cls, name ):
+
+	#  Attach read-only to a lexicon in a shared memory block created by
+	#  share() in another process
+	#
+	#  name:  Name of the shared memory block
+
+		from multiprocessing import shared_memory
+
+		shm = shared_memory.SharedMemory( name = name )
+
+		lex = cls( shm.buf.toreadonly() )
+		lex.shm = shm
+
+		#  The block can only be closed once no array views remain
+
+		atexit.register( lex.close )
+
+		return lex
+
+	def close( self ):
+
+	#  Drop the arrays of the lexicon and close its shared memory block,
+	#  if it has one
+
+		self.arrays = { }
+		self.avg = None
+		self.std = None
+		self.wt = None
+		self.wmu = None
+		self.buf = None
+
+		if self.shm is not None:
+			self.shm.close()
+			self.shm = None
+
+	def share( self ):
+
+	#  Copy the lexicon, including replaced rows, into a new shared memory
+	#  block; workers pass its name to attach() instead of each holding a
+	#  copy. The caller owns the block and should close() and unlink() it
+	#  once the workers are done
+
+		from multiprocessing import shared_memory
+
+		size = len( self.buf )
+		shm = shared_memory.SharedMemory( create = True, size = size )
+		shm.buf[ :size ] = self.buf[ :size ]
+
+		for name, arr in self.arrays.items():
+			dst = np.frombuffer( shm.buf, dtype = '<f4', count = arr.size,
+			                     offset = self.offsets[ name ] )
+			dst[ : ] = arr.ravel()
+			del dst
+
+		return shm
+
+	def replace( self, row, v, a ):
+
+	#  Replace the average valence and arousal of a row, keeping its
+	#  weighted average consistent; the arrays are copied out of the
+	#  (read-only) mapping on the first write
+	#
+	#  row:  Row to change
+	#  v:    Valence
+	#  a:    Arousal
+
+		if not self.avg.flags.writeable:
+			self.avg = self.avg.copy()
+			self.wmu = self.wmu.copy()
+			self.arrays[ 'avg' ] = self.avg
+			self.arrays[ 'wmu' ] = self.wmu
+
+		self.avg[ row, 0 ] = v
+		self.avg[ row, 1 ] = a
+		self.wmu[ row ] = self.wt[ row ] * self.avg[ row ]
+
+#  End class Lexicon
+
+
+if __name__ == '__main__':
+	compile_lexicon()
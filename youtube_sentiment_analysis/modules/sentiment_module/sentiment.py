@@ -12,16 +12,36 @@
 #										these are not ANEW-only terms		#
 #---------------------------------------------------------------------------#
 
-import math
-import nltk
+import csv
+import functools
+import itertools
+import numpy as np
 
-#  Import raw ANEW and Happiness dictionary data from term file
+from .lexicon import Lexicon, weight
 
-from .sentiment_term import anew_word as anew_word
-from .sentiment_term import anew_stem as anew_stem
-from .sentiment_term import hapi_word as hapi_word
+#  The compiled ANEW and Happiness dictionaries (see LEXICON.PY) are
+#  memory-mapped lazily, on the first call that needs them or through
+#  preload(); each dictionary maps a term to its row in the lexicon
+#  arrays, which also hold the precomputed Gaussian weights of every term
 
-__all__ = ['add_term', 'sentiment', 'exist']
+lexicon = None
+
+anew_word = None
+anew_stem = None
+hapi_word = None
+
+__all__ = ['add_term', 'attach', 'batch_sentiment', 'cache_clear',
+           'cache_info', 'load_terms', 'preload', 'sentiment', 'set_cache_size',
+           'set_stem_fallback', 'share', 'exist']
+
+CACHE_SIZE = 8192						# Cached term lists in sentiment()
+STEM_CACHE_SIZE = 65536					# Cached surface form -> stem pairs
+
+#  When set, terms missing from the dictionaries are matched by their
+#  Porter stem (e.g., "killing" -> "kill"); see set_stem_fallback()
+
+stem_fallback = False
+porter = None							# Shared Porter stemmer, built on first use
 
 #  Setup a "custom" dictionary to allow users to extend the ANEW and
 #  happiness dictionaries
@@ -29,12 +49,195 @@ __all__ = ['add_term', 'sentiment', 'exist']
 cust_dict = { }							# Custom dictionary, raw terms
 cust_stem = { }							# Custom dictionary, stemmed terms
 
+#  Merged index over all dictionaries, mapping every term to the row of
+#  its winning entry (anew_word, anew_stem, cust_dict, cust_stem, then
+#  hapi_word). Lexicon rows are read straight from the lexicon arrays;
+#  rows past the lexicon are custom terms, kept in a small side list of
+#  ( v_avg, a_avg, v_std, a_std, v_wt, a_wt, v_wmu, a_wmu ) entries.
+#  Built by preload()
 
-def add_term( term, v, a, replace = False ):
+index = None
+custom = [ ]							# Custom rows, past the lexicon rows
+custom_array = None						# NumPy copy of custom, built on use
 
-#  Add a term to the custom dictionary; if it already exists one of
-#  the default dictionaries, the request will be ignored unless the
-#  user explicitly asks for the value to be changed
+_COLUMNS = { 'avg': 0, 'std': 2, 'wt': 4, 'wmu': 6 }
+
+
+def _install( lex ):
+
+#  Make a loaded lexicon the active one and build the merged index over
+#  it; custom terms added so far are carried over
+#
+#  lex:  Lexicon to use
+
+	global lexicon
+	global anew_word
+	global anew_stem
+	global hapi_word
+	global index
+
+
+	if lexicon is not None:
+		for table in [ cust_dict, cust_stem ]:
+			for e in table.values():
+				e[ 'row' ] = e[ 'row' ] - lexicon.rows + lex.rows
+
+	anew_word = lex.tables[ 'anew_word' ]
+	anew_stem = lex.tables[ 'anew_stem' ]
+	hapi_word = lex.tables[ 'hapi_word' ]
+
+	index = { }
+
+	for table in [ hapi_word, anew_stem, anew_word ]:
+		index.update( table )
+
+	lexicon = lex
+
+	for term in list( cust_stem ) + list( cust_dict ):
+		_reindex( term )
+
+	cache_clear()
+
+#  End function _install
+
+
+def _put_entry( table, term, v, a ):
+
+#  Store a custom term with unit standard deviation in the custom rows,
+#  reusing its row if the term is already in the custom dictionary;
+#  returns the row
+#
+#  table:  Custom dictionary (cust_dict or cust_stem)
+#  term:   Term to store
+#  v:      Valence
+#  a:      Arousal
+
+	global custom_array
+
+
+	wt, wmu = weight( [ v, a ], [ 1, 1 ] )
+	e = ( v, a, 1, 1 ) + tuple( wt ) + tuple( wmu )
+
+	if term in table:
+		row = table[ term ][ 'row' ]
+		custom[ row - lexicon.rows ] = e
+	else:
+		row = lexicon.rows + len( custom )
+		custom.append( e )
+
+	custom_array = None
+
+	return row
+
+#  End function _put_entry
+
+
+def _read_rows( terms ):
+
+#  Yield the rows of a CSV/TSV lexicon; text lines are split on tabs if
+#  the first line has one, otherwise on commas, and other items are
+#  passed through as rows
+#
+#  terms:  Iterable of lines or rows
+
+	terms = iter( terms )
+	first = next( terms, None )
+
+	if first is None:
+		return
+	elif not isinstance( first, str ):
+		yield first
+		yield from terms
+		return
+
+	delimiter = '\t' if '\t' in first else ','
+	yield from csv.reader( itertools.chain( [ first ], terms ),
+	                       delimiter = delimiter )
+
+#  End function _read_rows
+
+
+def _reindex( term ):
+
+#  Update the merged index for a single term after one of the
+#  dictionaries changed, keeping the dictionary precedence
+#
+#  term:  Term to update
+
+	global cust_dict
+	global cust_stem
+
+
+	if term in anew_word:
+		index[ term ] = anew_word[ term ]
+	elif term in anew_stem:
+		index[ term ] = anew_stem[ term ]
+	elif term in cust_dict:
+		index[ term ] = cust_dict[ term ][ 'row' ]
+	elif term in cust_stem:
+		index[ term ] = cust_stem[ term ][ 'row' ]
+	elif term in hapi_word:
+		index[ term ] = hapi_word[ term ]
+	else:
+		index.pop( term, None )
+
+#  End function _reindex
+
+
+def _row( term ):
+
+#  Return the merged index row of a term, or of its stem if the term
+#  itself is not in the dictionaries; None if neither is found
+#
+#  term:  Term to check
+
+	row = index.get( term )
+	if row is None:
+		row = index.get( _stem( term ) )
+
+	return row
+
+#  End function _row
+
+
+def _score( term ):
+
+#  Return the ( valence, arousal ) of a term sequence; fused lookup that
+#  resolves each term with one probe of the merged index and accumulates
+#  the weighted valence and arousal sums in the same pass
+#
+#  term:  Tuple of terms
+
+	lookup = _row if stem_fallback else index.get
+
+	rows = [ r for r in map( lookup, term ) if r is not None ]
+	if not rows:
+		return ( 0.0, 0.0 )
+
+	v_prob_sum, a_prob_sum = np.add.reduce( _take( 'wt', rows ), axis = 0,
+	                                        dtype = np.float64 ).tolist()
+	v_sum, a_sum = np.add.reduce( _take( 'wmu', rows ), axis = 0,
+	                              dtype = np.float64 ).tolist()
+
+	val = v_sum / v_prob_sum if v_prob_sum > 0.0 else 0.0
+	aro = a_sum / a_prob_sum if a_prob_sum > 0.0 else 0.0
+
+	return ( val, aro )
+
+#  End function _score
+
+
+#  Bounded LRU memo of _score() keyed by the term tuple; duplicate comments
+#  ("first", copy-paste replies, ...) are scored once
+
+_score_cached = functools.lru_cache( maxsize = CACHE_SIZE )( _score )
+
+
+def _set_term( term, v, a, replace ):
+
+#  Add a term to the custom dictionary or replace its value, without
+#  updating the merged index or clearing the score cache (see add_term()
+#  and load_terms()); returns 'added', 'replaced' or 'skipped'
 #
 #  term:     Term to add
 #  v:        Valence
@@ -47,44 +250,143 @@ def add_term( term, v, a, replace = False ):
 
 	#  If term already exists and user does not ask to replace it, stop
 
-	if exist( term ) and replace != True:
-		return
+	existed = term in index or term in cust_dict or term in cust_stem
+	if existed and replace != True:
+		return 'skipped'
 
 	#  Otherwise either replace it or add it to the custom dictionary
 
 	if term in anew_word and replace == True:
-		anew_word[ term ][ 'avg' ][ 0 ] = a
-		anew_word[ term ][ 'avg' ][ 1 ] = v
+		row = anew_word[ term ]
 	elif term in anew_stem and replace == True:
-		anew_stem[ term ][ 'avg' ][ 0 ] = a
-		anew_stem[ term ][ 'std' ][ 1 ] = v
+		row = anew_stem[ term ]
 	elif term in hapi_word:
-		hapi_word[ term ][ 'avg' ][ 0 ] = a
-		hapi_word[ term ][ 'std' ][ 1 ] = v
+		row = hapi_word[ term ]
 	else:
+		row = None
+
+	if row is not None:
+		lexicon.replace( row, v, a )
+
+	else:
+		row = _put_entry( cust_dict, term, v, a )
+
 		cust_dict[ term ] = { }
 		cust_dict[ term ][ 'dict' ] = "custom"
 		cust_dict[ term ][ 'word' ] = term
-		cust_dict[ term ][ 'avg' ] = [ a, v ]
+		cust_dict[ term ][ 'avg' ] = [ v, a ]
 		cust_dict[ term ][ 'std' ] = [ 1, 1 ]
 		cust_dict[ term ][ 'fq' ] = 1
+		cust_dict[ term ][ 'row' ] = row
 
 		#  Build a stem for the custom term
 
-		porter = nltk.stem.porter.PorterStemmer()
-		stem = porter.stem( term )
+		stem = _stem( term )
 
-		cust_dict[ term ][ 'stem' ] = porter.stem( term )
+		cust_dict[ term ][ 'stem' ] = stem
 
 		#  Add term to custom stem dictionary with stem as key
 
+		row = _put_entry( cust_stem, stem, v, a )
+
 		cust_stem[ stem ] = { }
 		cust_stem[ stem ][ 'dict' ] = "custom"
 		cust_stem[ stem ][ 'word' ] = stem
 		cust_stem[ stem ][ 'stem' ] = stem
-		cust_stem[ stem ][ 'avg' ] = [ a, v ]
+		cust_stem[ stem ][ 'avg' ] = [ v, a ]
 		cust_stem[ stem ][ 'std' ] = [ 1, 1 ]
 		cust_stem[ stem ][ 'fq' ] = 1
+		cust_stem[ stem ][ 'row' ] = row
+
+	if existed:
+		return 'replaced'
+
+	return 'added'
+
+#  End function _set_term
+
+
+def _take( name, rows ):
+
+#  Return the given rows of a lexicon array as a [ rows x 2 ] array
+#  (float32 without custom rows, float64 otherwise); lexicon rows are read
+#  from the (memory-mapped or shared) lexicon arrays, custom rows from the
+#  side list
+#
+#  name:  Array name ( 'avg', 'std', 'wt' or 'wmu' )
+#  rows:  Merged index rows
+
+	global custom_array
+
+
+	arr = lexicon.arrays[ name ]
+
+	if not custom:
+		return arr.take( rows, axis = 0 )
+
+	rows = np.asarray( rows, dtype = np.intp )
+
+	if custom_array is None:
+		custom_array = np.array( custom, dtype = np.float64 )
+
+	col = _COLUMNS[ name ]
+	lex_rows = rows < lexicon.rows
+
+	out = np.empty( ( len( rows ), 2 ) )
+	out[ lex_rows ] = arr[ rows[ lex_rows ] ]
+	out[ ~lex_rows ] = custom_array[ rows[ ~lex_rows ] - lexicon.rows, col: col + 2 ]
+
+	return out
+
+#  End function _take
+
+
+@functools.lru_cache( maxsize = STEM_CACHE_SIZE )
+def _stem( term ):
+
+#  Return the Porter stem of a term, reusing one stemmer instance and
+#  memoizing the surface form -> stem mapping
+#
+#  term:  Term to stem
+
+	global porter
+
+
+	if porter is None:
+		from nltk.stem.porter import PorterStemmer
+		porter = PorterStemmer()
+
+	return porter.stem( term )
+
+#  End function _stem
+
+
+def add_term( term, v, a, replace = False ):
+
+#  Add a term to the custom dictionary; if it already exists one of
+#  the default dictionaries, the request will be ignored unless the
+#  user explicitly asks for the value to be changed
+#
+#  term:     Term to add
+#  v:        Valence
+#  a:        Arousal
+#  replace:  Replace term that exists in default dictionaries
+
+	global cust_dict
+
+
+	preload()
+
+	if _set_term( term, v, a, replace ) == 'skipped':
+		return
+
+	#  Bring the merged index up to date for the term and its stem
+
+	_reindex( term )
+	if term in cust_dict:
+		_reindex( cust_dict[ term ][ 'stem' ] )
+
+	cache_clear()
 
 #  End function add_term
 
@@ -95,34 +397,18 @@ def arousal( term ):
 #
 #  term:  Term to check (can be string or list of strings)
 
+	preload()
+
 	if isinstance( term, str ):
 		return arousal_raw( term )[ 0 ]
 
 	elif not isinstance( term, list ):
 		return 0.0
 
-	#  At this point we know we're working with a list of terms
-
-	c = 2.0 * math.pi
-	prob = [ ]
-	prob_sum = 0.0
-	a_mu = [ ]
+	#  At this point we know we're working with a list of terms; every
+	#  row carries its precomputed Gaussian weight and weighted average
 
-	for t in term:
-		if exist( t ):
-			a = arousal_raw( t )
-
-			p = 1.0 / math.sqrt( c * math.pow( a[ 1 ], 2.0 ) )
-			prob.append( p )
-			prob_sum = prob_sum + p
-		
-			a_mu.append( a[ 0 ] )
-
-	arousal = 0.0
-	for i in range( 0, len( a_mu ) ):
-		arousal = arousal + ( prob[ i ] / prob_sum * a_mu[ i ] )
-
-	return arousal
+	return _score( term )[ 1 ]
 
 # End function arousal
 
@@ -133,34 +419,90 @@ def arousal_raw( term ):
 #
 #  term:  Term to check
 
-	global cust_dict
-	global cust_stem
+	preload()
 
+	row = index.get( term )
+	if row is None:
+		return [ 0.0, 0.0 ]
 
-	if not exist( term ):
-		avg = 0.0
-		std = 0.0
-	elif term in anew_word:
-		avg = anew_word[ term ][ 'avg' ][ 1 ]
-		std = anew_word[ term ][ 'std' ][ 1 ]
-	elif term in anew_stem:
-		avg = anew_stem[ term ][ 'avg' ][ 1 ]
-		std = anew_stem[ term ][ 'std' ][ 1 ]
-	elif term in cust_dict:
-		avg = cust_dict[ term ][ 'avg' ][ 1 ]
-		std = cust_dict[ term ][ 'std' ][ 1 ]
-	elif term in cust_stem:
-		avg = cust_stem[ term ][ 'avg' ][ 1 ]
-		std = cust_stem[ term ][ 'std' ][ 1 ]
-	else:
-		avg = hapi_word[ term ][ 'avg' ][ 1 ]
-		std = hapi_word[ term ][ 'std' ][ 1 ]
-
-	return [ avg, std ]
+	return [ _take( 'avg', [ row ] )[ 0, 1 ].item(), _take( 'std', [ row ] )[ 0, 1 ].item() ]
 
 # End function arousal_raw
 
 
+def batch_sentiment( terms ):
+
+#  Return the valence and arousal sentiment for many term lists at once,
+#  as NumPy arrays with one value per list; the values match those of
+#  sentiment() for each list
+#
+#  terms:  List of term lists (e.g., the tokens of many comments)
+
+	preload()
+
+	#  Map every term to its merged index row once, building a CSR-style
+	#  (indptr, rows) matrix
+
+	lookup = _row if stem_fallback else index.get
+
+	rows = [ ]
+	indptr = [ 0 ]
+
+	for term_list in terms:
+		rows.extend( [ r for r in map( lookup, term_list ) if r is not None ] )
+		indptr.append( len( rows ) )
+
+	#  Per-list sums of the precomputed weights give the weighted means
+
+	prob = _take( 'wt', rows )
+	prob_mu = _take( 'wmu', rows )
+	doc = np.repeat( np.arange( len( terms ) ), np.diff( indptr ) )
+
+	sen = { }
+	for i, key in enumerate( [ 'valence', 'arousal' ] ):
+		prob_sum = np.bincount( doc, prob[ :, i ], len( terms ) )
+		mu_sum = np.bincount( doc, prob_mu[ :, i ], len( terms ) )
+
+		sen[ key ] = np.zeros( len( terms ) )
+		np.divide( mu_sum, prob_sum, out = sen[ key ], where = prob_sum > 0 )
+
+	return sen
+
+# End function batch_sentiment
+
+
+def attach( name ):
+
+#  Score with the dictionaries a parent process put in shared memory with
+#  share(), instead of mapping the lexicon file; use it as the initializer
+#  of scoring worker processes
+#
+#  name:  Name of the shared memory block returned by share()
+
+	_install( Lexicon.attach( name ) )
+
+# End function attach
+
+
+def cache_clear():
+
+#  Clear the sentiment() memo cache and its hit/miss counters
+
+	_score_cached.cache_clear()
+
+# End function cache_clear
+
+
+def cache_info():
+
+#  Return the hits, misses, maxsize and current size of the sentiment()
+#  memo cache
+
+	return _score_cached.cache_info()
+
+# End function cache_info
+
+
 def exist( term ):
 
 #  Return True if a term exists in one of the sentiment dictionaries,
@@ -168,24 +510,13 @@ def exist( term ):
 #
 #  term:  Term to check (can be string or list of strings)
 
-	global cust_dict
-	global cust_stem
-
+	preload()
 
 	if isinstance( term, str ):
-		ex = term in anew_word or term in anew_stem or\
-		     term in hapi_word or term in cust_dict or term in cust_stem
-		return ex
+		return term in index
 
 	elif isinstance( term, list ):
-		term_list = [ ]
-
-		for t in term:
-			ex = t in anew_word or t in anew_stem or\
-			     t in hapi_word or t in cust_dict or t in cust_stem
-			term_list.append( ex )
-
-		return term_list
+		return [ t in index for t in term ]
 
 	else:
 		return False
@@ -193,57 +524,154 @@ def exist( term ):
 # End function exist
 
 
+def load_terms( terms, replace = False ):
+
+#  Add many terms to the custom dictionary at once, e.g. a domain lexicon
+#  of slang or gaming terms; the merged index and the score cache are
+#  updated once at the end. Returns the number of terms added, replaced
+#  and skipped (existing terms without replace, or malformed rows)
+#
+#  terms:    Path of a CSV/TSV file, or an iterable of CSV/TSV lines or of
+#            ( term, valence, arousal ) rows; a header line is ignored
+#  replace:  Replace terms that exist in the dictionaries
+
+	global cust_dict
+
+
+	preload()
+
+	if isinstance( terms, str ):
+		with open( terms, newline = '', encoding = 'utf-8' ) as f:
+			return load_terms( f, replace )
+
+	count = { 'added': 0, 'replaced': 0, 'skipped': 0 }
+	changed = set( )
+
+	for n, row in enumerate( _read_rows( terms ) ):
+		try:
+			term = row[ 0 ].strip( )
+			v = float( row[ 1 ] )
+			a = float( row[ 2 ] )
+		except ( IndexError, ValueError ):
+			if n > 0:
+				count[ 'skipped' ] = count[ 'skipped' ] + 1
+			continue
+
+		status = _set_term( term, v, a, replace )
+		count[ status ] = count[ status ] + 1
+
+		if status != 'skipped':
+			changed.add( term )
+			if term in cust_dict:
+				changed.add( cust_dict[ term ][ 'stem' ] )
+
+	for term in changed:
+		_reindex( term )
+
+	cache_clear()
+
+	return count
+
+# End function load_terms
+
+
+def preload():
+
+#  Load the compiled dictionaries and build the merged index if this has
+#  not happened yet; scoring calls do this on first use, worker processes
+#  can call it up front to warm up
+
+	if lexicon is None:
+		_install( Lexicon.load() )
+
+# End function preload
+
+
 def sentiment( term ):
 
 #  Return the valence and arousal sentiment for a term
 #
 #  term:  Term to check (can be string or list of strings)
 
+	preload()
+
 	sen = { 'valence': 0.0, 'arousal': 0.0 }
 
-	if isinstance( term, str ) or isinstance( term, list ):
+	if isinstance( term, str ):
 		sen[ 'valence' ] = valence( term )
 		sen[ 'arousal' ] = arousal( term )
 
+	elif isinstance( term, list ):
+		sen[ 'valence' ], sen[ 'arousal' ] = _score_cached( tuple( term ) )
+
 	return sen
 
 # End function sentiment
 
 
+def set_cache_size( size ):
+
+#  Resize the sentiment() memo cache, dropping its contents
+#
+#  size:  Maximum number of cached term lists (0 disables caching)
+
+	global _score_cached
+
+
+	_score_cached = functools.lru_cache( maxsize = size )( _score )
+
+# End function set_cache_size
+
+
+def set_stem_fallback( enable ):
+
+#  Turn the stem fallback on or off for the list scorers; when on, a term
+#  that is in none of the dictionaries is looked up by its Porter stem
+#
+#  enable:  True to match unknown terms by their stem
+
+	global stem_fallback
+
+
+	stem_fallback = enable == True
+	cache_clear()
+
+# End function set_stem_fallback
+
+
+def share():
+
+#  Put the dictionaries in a shared memory block that scoring workers can
+#  attach() to read-only, so N workers hold one copy of the lexicon arrays;
+#  returns the block (pass its name to the workers, close() and unlink()
+#  it when they are done). Custom terms are not shared, workers add their
+#  own with add_term() or load_terms()
+
+	preload()
+
+	return lexicon.share()
+
+# End function share
+
+
 def valence( term ):
 
 #  Return the average valence for a term
 #
 #  term:  Term to check (can be string or list of strings)
 
+	preload()
+
 	if isinstance( term, str ):
 		return valence_raw( term )[ 0 ]
 
 	elif not isinstance( term, list ):
 		return 0.0
 
-	#  At this point we know we're working with a list of terms
-
-	c = 2.0 * math.pi
-	prob = [ ]
-	prob_sum = 0.0
-	v_mu = [ ]
-
-	for t in term:
-		if exist( t ):
-			v = valence_raw( t )
-
-			p = 1.0 / math.sqrt( c * math.pow( v[ 1 ], 2.0 ) )
-			prob.append( p )
-			prob_sum = prob_sum + p
-		
-			v_mu.append( v[ 0 ] )
-
-	val = 0.0
-	for i in range( 0, len( v_mu ) ):
-		val = val + ( prob[ i ] / prob_sum * v_mu[ i ] )
+	#  At this point we know we're working with a list of terms; every
+	#  row carries its precomputed Gaussian weight and weighted average
 
-	return val
+	return _score( term )[ 0 ]
 
 # End function valence
 
@@ -254,29 +682,12 @@ def valence_raw( term ):
 #
 #  term:  Term to check
 
-	global cust_dict
-	global cust_stem
+	preload()
 
+	row = index.get( term )
+	if row is None:
+		return [ 0.0, 0.0 ]
 
-	if not exist( term ):
-		avg = 0.0
-		std = 0.0
-	elif term in anew_word:
-		avg = anew_word[ term ][ 'avg' ][ 0 ]
-		std = anew_word[ term ][ 'std' ][ 0 ]
-	elif term in anew_stem:
-		avg = anew_stem[ term ][ 'avg' ][ 0 ]
-		std = anew_stem[ term ][ 'std' ][ 0 ]
-	elif term in cust_dict:
-		avg = cust_dict[ term ][ 'avg' ][ 0 ]
-		std = cust_dict[ term ][ 'std' ][ 0 ]
-	elif term in cust_stem:
-		avg = cust_stem[ term ][ 'avg' ][ 0 ]
-		std = cust_stem[ term ][ 'std' ][ 0 ]
-	else:
-		avg = hapi_word[ term ][ 'avg' ][ 0 ]
-		std = hapi_word[ term ][ 'std' ][ 0 ]
-
-	return [ avg, std ]
+	return [ _take( 'avg', [ row ] )[ 0, 0 ].item(), _take( 'std', [ row ] )[ 0, 0 ].item() ]
 
 # End function valence_raw
@@ -12,11 +12,14 @@ import pickle
 import time
 
 import nltk
+import numpy as np
 from nltk.classify.scikitlearn import SklearnClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.naive_bayes import MultinomialNB, BernoulliNB
 from sklearn.svm import SVC, NuSVC
 
+from youtube_sentiment_analysis.modules.distill import DistilledClassifier
+from youtube_sentiment_analysis.modules.linear import LinearScorer
 from youtube_sentiment_analysis.modules.process import ProcessData
 
 # Constants
@@ -27,6 +30,10 @@ __email__ = 'alex_grigoras_10@yahoo.com'
 __status__ = 'release'
 
 CLASSIFIERS_PATH = "youtube_sentiment_analysis/data/classifiers/"
+DISTILLED_CLASSIFIER = "distilled_classifier.pickle"
+DISTILL_BATCH_SIZE = 1000
+DISTILL_TEST_SIZE = 0.2
+LINEAR_EXTENSION = ".npz"
 
 
 class TrainClassifier:
@@ -102,6 +109,10 @@ class TrainClassifier:
             self.__save_classifier(classifier_name, classifier)
             self.__trained_classifiers.append(classifier)
 
+            # the weights of the linear classifiers are also exported, for a faster voting
+            if self.__export_linear(classifier_name, classifier):
+                console.append("> Exported the linear weights of the classifier: " + classifier_name)
+
             progress_value += 100/nr_classifiers
             progress.setValue(progress_value)
 
@@ -116,7 +127,9 @@ class TrainClassifier:
 
         classifiers = []
 
-        read_directory = os.listdir(CLASSIFIERS_PATH)
+        # the distilled classifier is not a voter
+        read_directory = [f for f in os.listdir(CLASSIFIERS_PATH)
+                          if f.endswith(".pickle") and f != DISTILLED_CLASSIFIER]
 
         if len(read_directory) == 0:
             console.append("> Training the classifiers: ")
@@ -126,19 +139,100 @@ class TrainClassifier:
             console.append("> Getting the trained classifiers: ")
             file_nr = 1
             for f in read_directory:
-                console.append("  " + str(file_nr) + ". " + f)
+                # the exported linear weights replace the classifier, unless they are older
+                linear_file = f[:-len(".pickle")] + LINEAR_EXTENSION
+                if os.path.exists(CLASSIFIERS_PATH + linear_file) and \
+                        os.path.getmtime(CLASSIFIERS_PATH + linear_file) >= os.path.getmtime(CLASSIFIERS_PATH + f):
+                    console.append("  " + str(file_nr) + ". " + linear_file)
+                    classifiers.append(self.open_linear_classifier(linear_file))
+                else:
+                    console.append("  " + str(file_nr) + ". " + f)
+                    classifiers.append(self.open_classifier(f))
                 file_nr = file_nr + 1
-                classifiers.append(self.open_classifier(f))
             console.append("  " + str(file_nr) + ". vader classifier")
             console.append("  " + str(file_nr + 1) + ". anew classifier")
 
         return classifiers
 
+    def distill(self, progress, console):
+        """Train a single linear model (DistilledClassifier) mimicking the voting system on the dataset, report how
+            often they agree on the held out texts and save it beside the classifiers"""
+        # imported here, the vote classifier module imports this module
+        from youtube_sentiment_analysis.modules.vote_classifier import VoteClassifier
+
+        # get the starting time
+        start_time = time.time()
+
+        voted_classifier = VoteClassifier(self.get_classifiers(progress, console))
+
+        text_data, _ = self.get_dataset_labeled()
+        token_lists = [ProcessData.tokenize(text) for text in text_data]
+
+        # scores and confidences of the voting system, the targets of the distilled classifier
+        scores = []
+        confidences = []
+        for start in range(0, len(text_data), DISTILL_BATCH_SIZE):
+            end = start + DISTILL_BATCH_SIZE
+            batch_scores, batch_confidences = voted_classifier.classify_many(text_data[start:end],
+                                                                              token_lists[start:end])
+            scores.extend(batch_scores)
+            confidences.extend(batch_confidences)
+
+            progress.setValue(80 * end / len(text_data))
+
+        # hold out a random part of the texts to measure the agreement
+        order = np.random.RandomState(0).permutation(len(text_data))
+        nr_test = int(len(text_data) * DISTILL_TEST_SIZE)
+        train_ids, test_ids = order[nr_test:], order[:nr_test]
+
+        distilled = DistilledClassifier()
+        distilled.fit([token_lists[i] for i in train_ids], np.array(scores)[train_ids],
+                      np.array(confidences)[train_ids])
+
+        agreement, difference = distilled.agreement([token_lists[i] for i in test_ids], np.array(scores)[test_ids])
+        console.append("> Distilled classifier agreement with the voting system: %.2f%% (mean score difference %f)"
+                       % (100 * agreement, difference))
+
+        self.__save_classifier(DISTILLED_CLASSIFIER[:-len(".pickle")], distilled)
+        progress.setValue(100)
+
+        # get the ending time and calculate elapsed time
+        elapsed_time = time.time() - start_time
+        console.append("> Distillation finished in " + time.strftime("%H:%M:%S", time.gmtime(elapsed_time)) +
+                       " seconds")
+
+        return distilled
+
+    def get_distilled_classifier(self):
+        """Returns the distilled classifier (see distill), None if it was not trained"""
+
+        if not os.path.exists(CLASSIFIERS_PATH + DISTILLED_CLASSIFIER):
+            return None
+
+        return self.open_classifier(DISTILLED_CLASSIFIER)
+
+    def export_linear(self, console):
+        """Export the weights and the vocabulary of the saved linear classifiers (see LinearScorer), which are then
+            used by get_classifiers instead of the classifiers"""
+
+        for f in os.listdir(CLASSIFIERS_PATH):
+            if f.endswith(".pickle") and f != DISTILLED_CLASSIFIER:
+                if self.__export_linear(f[:-len(".pickle")], self.open_classifier(f)):
+                    console.append("> Exported the linear weights of the classifier: " + f)
+                else:
+                    console.append("> The classifier is not linear: " + f)
+
     def get_trained_classifiers(self):
         """Returns a list with trained classifiers objects"""
 
         return self.__trained_classifiers
 
+    @staticmethod
+    def get_vocabulary(classifier):
+        """Returns the frozen vocabulary (word -> feature column) of a trained nltk SklearnClassifier"""
+
+        return classifier._vectorizer.vocabulary_
+
     @staticmethod
     def __save_classifier(_name, _classifier):
         """Save in file to avoid training the data again"""
@@ -147,6 +241,18 @@ class TrainClassifier:
         pickle.dump(_classifier, save_document)
         save_document.close()
 
+    @staticmethod
+    def __export_linear(_name, _classifier):
+        """Save the weights of a linear classifier in a numpy file, returns False if the classifier is not linear"""
+
+        scorer = LinearScorer.from_classifier(_classifier)
+        if scorer is None:
+            return False
+
+        scorer.save(CLASSIFIERS_PATH + _name + LINEAR_EXTENSION)
+
+        return True
+
     @staticmethod
     def open_classifier(name):
         """Open the trained classifier with the data from nltk library"""
@@ -157,6 +263,12 @@ class TrainClassifier:
 
         return classifier
 
+    @staticmethod
+    def open_linear_classifier(name):
+        """Open the exported weights of a linear classifier (see LinearScorer)"""
+
+        return LinearScorer.load(CLASSIFIERS_PATH + name)
+
     def get_dataset_split(self):
         """Get dataset from files (negative and positive words)
             25000 train + 25000 test (imdb)"""
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+    Shared VADER scorer
+    @alexandru_grigoras
+"""
+
+# Libraries
+import hashlib
+import itertools
+from collections import OrderedDict, namedtuple
+
+from nltk.sentiment import SentimentIntensityAnalyzer
+
+# Constants
+__all__ = ['VaderScorer']
+__version__ = '1.0'
+__author__ = 'Alexandru Grigoras'
+__email__ = 'alex_grigoras_10@yahoo.com'
+__status__ = 'release'
+
+CACHE_SIZE = 8192                   # texts, keyed by a 16 byte digest so long reviews do not stay in memory
+CHUNK_SIZE = 1000
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class VaderScorer:
+    """VADER scorer shared by the whole process (see get_instance), so that the lexicon is loaded once; the scores
+        of the last texts are memoized by a digest of the text with normalized whitespace, which VADER ignores (it
+        splits the text at whitespace)"""
+
+    # scorer of the current process, created on first use
+    __instance = None
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        """Class constructor
+            cache_size: number of memoized texts"""
+        self.__sid = SentimentIntensityAnalyzer()
+        self.__cache_size = cache_size
+        self.__scores = OrderedDict()           # text digest -> scores, least recently used first
+        self.__hits = 0
+        self.__misses = 0
+
+    @classmethod
+    def get_instance(cls):
+        """Returns the scorer of the current process"""
+        if cls.__instance is None:
+            cls.__instance = cls()
+
+        return cls.__instance
+
+    def polarity_scores(self, text):
+        """Returns the VADER scores (neg, neu, pos, compound) of a text, as SentimentIntensityAnalyzer"""
+        text = " ".join(text.split())
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+        scores = self.__scores.get(key)
+        if scores is not None:
+            self.__hits += 1
+            self.__scores.move_to_end(key)
+        else:
+            self.__misses += 1
+            scores = self.__sid.polarity_scores(text)
+            if self.__cache_size > 0:
+                self.__scores[key] = scores
+                if len(self.__scores) > self.__cache_size:
+                    self.__scores.popitem(last=False)
+
+        return dict(scores)
+
+    def polarity_scores_many(self, texts, pool=None, chunk_size=CHUNK_SIZE):
+        """Returns the list of the VADER scores of the texts, scored in chunks mapped over a process pool (e.g.
+            multiprocessing.Pool) if given, in the order of the texts"""
+        if pool is None:
+            return [self.polarity_scores(text) for text in texts]
+
+        texts = iter(texts)
+        chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+
+        return [scores for chunk in pool.imap(self.score_chunk, chunks) for scores in chunk]
+
+    def cache_info(self):
+        """Returns the statistics of the memoized scores (hits, misses, maxsize, currsize)"""
+        return CacheInfo(self.__hits, self.__misses, self.__cache_size, len(self.__scores))
+
+    @staticmethod
+    def score_chunk(texts):
+        """Returns the list of the VADER scores of a chunk of texts with the scorer of the current process, as a work
+            unit for a process pool"""
+        scorer = VaderScorer.get_instance()
+
+        return [scorer.polarity_scores(text) for text in texts]
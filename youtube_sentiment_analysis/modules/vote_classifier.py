@@ -6,74 +6,345 @@
 """
 
 # Libraries
-from statistics import mean
-from statistics import mode
-from nltk.sentiment import SentimentIntensityAnalyzer
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from youtube_sentiment_analysis.modules.linear import LinearScorer
+from youtube_sentiment_analysis.modules.process import ProcessData
 from youtube_sentiment_analysis.modules.sentiment_module import sentiment as anew
+from youtube_sentiment_analysis.modules.training import TrainClassifier
+from youtube_sentiment_analysis.modules.vader import VaderScorer
 
 # Constants
-__all__ = ['VoteClassifier']
+__all__ = ['VoteClassifier', 'Voter', 'SklearnVoter', 'LinearVoter', 'VaderVoter', 'AnewVoter']
 __version__ = '1.0'
 __author__ = 'Alexandru Grigoras'
 __email__ = 'alex_grigoras_10@yahoo.com'
 __status__ = 'release'
 
+ANEW_THRESHOLD = 5.8
+CASCADE_MARGIN = 0.3
+CHEAP_ESTIMATORS = ('MultinomialNB', 'BernoulliNB')
+
+
+class Voter(ABC):
+    """Abstract base class of the voters of VoteClassifier: a model giving a batch of texts scores in [-1, 1] and
+        votes (True for 'pos'); subclasses implement score_many, the calls and time are counted by VoteClassifier"""
+
+    def __init__(self, name, weight=1.0, enabled=True, cheap=False):
+        """Class constructor
+            name: unique name of the voter in a VoteClassifier
+            weight: weight of the voter in the mean score and in the confidence
+            enabled: disabled voters are not run
+            cheap: cheap voters vote first in the cascade mode of VoteClassifier"""
+        self.name = name
+        self.weight = weight
+        self.enabled = enabled
+        self.cheap = cheap
+        self.reset_stats()
+
+    @abstractmethod
+    def score_many(self, texts, token_lists, cache):
+        """Returns the scores and the votes arrays of a batch of texts and their filtered tokens
+            cache: dictionary shared by the voters for one batch (e.g. for the features matrices)"""
+
+    def reset_stats(self):
+        """Reset the number of calls, of scored texts and the time spent scoring them"""
+        self.calls = 0
+        self.nr_texts = 0
+        self.elapsed = 0.0
+
+
+class SklearnVoter(Voter):
+    """Voter of a trained nltk SklearnClassifier: the score is the probability of 'pos' minus that of 'neg', the
+        vote is the most probable label"""
+
+    def __init__(self, name, classifier, weight=1.0, enabled=True, cheap=None):
+        """Class constructor
+            cheap: by default, the naive bayes classifiers are cheap"""
+        if cheap is None:
+            cheap = type(classifier._clf).__name__ in CHEAP_ESTIMATORS
+
+        super().__init__(name, weight, enabled, cheap)
+        self.classifier = classifier
+
+    def score_many(self, texts, token_lists, cache):
+        """Returns the scores and the votes, predicting the probabilities of the whole batch with one call"""
+        # the features are vectorized once per vocabulary and batch
+        vocabulary = TrainClassifier.get_vocabulary(self.classifier)
+        key = ('features', id(vocabulary))
+        if key not in cache:
+            cache[key] = ProcessData.vectorize(token_lists, vocabulary)
+
+        features = cache[key]
+        if not self.classifier._vectorizer.sparse:
+            features = features.toarray()
+
+        prob = self.classifier._clf.predict_proba(features)
+        labels = list(self.classifier._encoder.classes_)
+        pos = prob[:, labels.index('pos')]
+        neg = prob[:, labels.index('neg')]
+
+        # ties are 'pos', as the max() of the nltk probability distribution
+        return pos - neg, pos >= neg
+
+
+class LinearVoter(Voter):
+    """Voter of a linear classifier exported with its vocabulary (LinearScorer): the same score as SklearnVoter,
+        computed for the whole batch with one sparse matrix-vector product"""
+
+    def __init__(self, name, scorer, weight=1.0, enabled=True, cheap=None):
+        """Class constructor
+            cheap: by default, the naive bayes classifiers are cheap"""
+        if cheap is None:
+            cheap = scorer.estimator in CHEAP_ESTIMATORS
+
+        super().__init__(name, weight, enabled, cheap)
+        self.scorer = scorer
+
+    def score_many(self, texts, token_lists, cache):
+        """Returns the scores and the votes (score >= 0, ties are 'pos' as in SklearnVoter)"""
+        # the features are vectorized once per vocabulary and batch
+        vocabulary = self.scorer.get_vocabulary()
+        key = ('features', id(vocabulary))
+        if key not in cache:
+            cache[key] = ProcessData.vectorize(token_lists, vocabulary)
+
+        scores = self.scorer.score_many(cache[key])
+
+        return scores, scores >= 0
+
+
+class VaderVoter(Voter):
+    """Voter of the VADER compound score, from the scorer shared by the process"""
+
+    def __init__(self, name='vader', weight=1.0, enabled=True, cheap=True, pool=None):
+        """Class constructor
+            pool: process pool scoring the batches in chunks (see VaderScorer.polarity_scores_many)"""
+        super().__init__(name, weight, enabled, cheap)
+        self.pool = pool
+
+    def score_many(self, texts, token_lists, cache):
+        """Returns the compound scores and the votes (compound >= 0)"""
+        scores = VaderScorer.get_instance().polarity_scores_many(texts, self.pool)
+        compound = np.array([ss["compound"] for ss in scores], dtype=float)
+
+        return compound, compound >= 0
+
+
+class AnewVoter(Voter):
+    """Voter of the ANEW valence of the filtered tokens, rescaled from [0, 10] to [-1, 1]"""
+
+    def __init__(self, name='anew', weight=1.0, enabled=True, cheap=True, threshold=ANEW_THRESHOLD):
+        """Class constructor
+            threshold: min valence of a 'pos' vote"""
+        super().__init__(name, weight, enabled, cheap)
+        self.threshold = threshold
+
+    def score_many(self, texts, token_lists, cache):
+        """Returns the rescaled valence scores and the votes (valence >= threshold)"""
+        valence = anew.batch_sentiment(token_lists)['valence']
+
+        return VoteClassifier.map(valence, 0, 10, -1, 1), valence >= self.threshold
+
 
 class VoteClassifier:
     """Voting system for classifiers for selecting the most modules sentiment from a list on classifiers"""
 
-    def __init__(self, classifiers):
-        """Class constructor"""
-        self.__classifiers = classifiers            # ml classifiers
-        self.__sid = SentimentIntensityAnalyzer()   # vader classifier
+    def __init__(self, classifiers, voters=None, cascade_margin=None):
+        """Class constructor
+            classifiers: ml classifiers (nltk SklearnClassifier or LinearScorer), voting before VADER and ANEW
+            voters: list of Voter objects replacing the default voters (classifiers, VADER and ANEW)
+            cascade_margin: enables the cascade mode of classify_many (see set_cascade_margin)"""
+        self.__voters = []
+        self.__cascade_margin = cascade_margin
+        self.__cascade_texts = 0                    # texts classified in cascade mode
+        self.__cascade_exits = 0                    # texts decided by the cheap voters alone
 
-    def classify(self, comment_text, pd):
-        """Returns the mean value of the classifiers results"""
-        votes = []
+        if voters is None:
+            voters = []
+            for i, classifier in enumerate(classifiers):
+                voter_class = LinearVoter if isinstance(classifier, LinearScorer) else SklearnVoter
+                voters.append(voter_class(self.__classifier_name(classifier, classifiers[:i]), classifier))
+            voters += [VaderVoter(), AnewVoter()]
+
+        for voter in voters:
+            self.register(voter)
+
+    def register(self, voter):
+        """Add a voter, after the other voters"""
+        if voter.name in self.get_voter_names():
+            raise ValueError("Voter already registered: " + voter.name)
 
-        # get ML classifiers results
-        for c in self.__classifiers:
-            pos = c.prob_classify(pd.get_word_feature()).prob('pos')
-            neg = c.prob_classify(pd.get_word_feature()).prob('neg')
-            votes.append(float(pos - neg))
+        self.__voters.append(voter)
 
-        # get Vader result
-        ss = self.__sid.polarity_scores(comment_text)
-        votes.append(ss["compound"])
+    def unregister(self, name):
+        """Remove a voter"""
+        self.__voters.remove(self.get_voter(name))
 
-        # get ANEW result
-        anew_result = anew.sentiment(pd.get_tokens())['valence']
-        votes.append(self.map(anew_result, 0, 10, -1, 1))
+    def get_voter(self, name):
+        """Returns the voter with the given name"""
+        for voter in self.__voters:
+            if voter.name == name:
+                return voter
 
-        return mean(votes)
+        raise KeyError(name)
+
+    def get_voter_names(self):
+        """Returns the names of the voters, in voting order"""
+        return [voter.name for voter in self.__voters]
+
+    def set_weight(self, name, weight):
+        """Set the weight of a voter"""
+        self.get_voter(name).weight = weight
+
+    def set_enabled(self, name, enabled=True):
+        """Enable or disable a voter"""
+        self.get_voter(name).enabled = enabled
+
+    def get_stats(self):
+        """Returns the statistics of each voter: (name, weight, enabled, calls, scored texts, seconds, milliseconds
+            per 1000 texts); the first ML classifier of a vocabulary also pays for vectorizing the batch"""
+        stats = []
+
+        for voter in self.__voters:
+            per_1k = 1e6 * voter.elapsed / voter.nr_texts if voter.nr_texts else 0.0
+            stats.append((voter.name, voter.weight, voter.enabled, voter.calls, voter.nr_texts, voter.elapsed,
+                          per_1k))
+
+        return stats
+
+    def reset_stats(self):
+        """Reset the statistics of all the voters and of the cascade mode"""
+        for voter in self.__voters:
+            voter.reset_stats()
+
+        self.__cascade_texts = 0
+        self.__cascade_exits = 0
+
+    def set_cascade_margin(self, margin=CASCADE_MARGIN):
+        """Enable the cascade mode of classify_many: the cheap voters vote first and the others only vote on the
+            texts where the cheap voters disagree or their mean score is within the margin from 0; None disables it"""
+        self.__cascade_margin = margin
+
+    def get_cascade_count(self):
+        """Returns the number of texts classified in cascade mode; 0 when the cascade mode was inactive (no margin,
+            or no enabled cheap or expensive voters, then classify_many votes with all the voters)"""
+        return self.__cascade_texts
+
+    def get_early_exit_ratio(self):
+        """Returns the fraction of the texts classified in cascade mode that were decided by the cheap voters"""
+        if not self.__cascade_texts:
+            return 0.0
+
+        return self.__cascade_exits / float(self.__cascade_texts)
+
+    def evaluate(self, comment_text, pd):
+        """Returns the mean value of the classifiers results, the confidence of the result and the votes ('pos' or
+            'neg') of the classifiers, running each classifier once"""
+        values, votes, weights = self.__vote([comment_text], [pd.get_tokens()])
+
+        score, conf = self.__combine(values, votes, weights)
+        labels = ["pos" if vote else "neg" for vote in votes[:, 0]]
+
+        return float(score[0]), float(conf[0]), labels
+
+    def classify(self, comment_text, pd):
+        """Returns the mean value of the classifiers results"""
+        return self.evaluate(comment_text, pd)[0]
 
     def confidence(self, comment_text, pd):
         """Returns the confidence of the result"""
+        return self.evaluate(comment_text, pd)[1]
+
+    def classify_many(self, texts, token_lists):
+        """Returns the mean values of the classifiers results and their confidences for a batch of texts, as numpy
+            arrays; each ML classifier predicts the probabilities of the whole batch with one call, on the features
+            of the filtered tokens of each text (see ProcessData.tokenize); in cascade mode, the expensive voters only
+            vote on the texts the cheap voters did not decide (see set_cascade_margin)"""
+        if not texts:
+            return np.zeros(0), np.zeros(0)
+
+        voters = [voter for voter in self.__voters if voter.enabled]
+        cheap = [voter for voter in voters if voter.cheap and voter.weight]
+        expensive = [voter for voter in voters if voter not in cheap]
+
+        if self.__cascade_margin is None or not cheap or not expensive:
+            return self.__combine(*self.__vote(texts, token_lists, voters))
+
+        # cascade mode: the texts where the cheap voters agree, far enough from 0, exit early
+        values, votes, weights = self.__vote(texts, token_lists, cheap)
+        score, conf = self.__combine(values, votes, weights)
+
+        agree = votes.all(axis=0) | ~votes.any(axis=0)
+        undecided = np.nonzero(~agree | (np.abs(score) < self.__cascade_margin))[0]
+
+        self.__cascade_texts += len(texts)
+        self.__cascade_exits += len(texts) - len(undecided)
+
+        if len(undecided):
+            more_values, more_votes, more_weights = self.__vote([texts[i] for i in undecided],
+                                                                [token_lists[i] for i in undecided], expensive)
+            score[undecided], conf[undecided] = self.__combine(np.vstack([values[:, undecided], more_values]),
+                                                               np.vstack([votes[:, undecided], more_votes]),
+                                                               np.concatenate([weights, more_weights]))
+
+        return score, conf
+
+    def __vote(self, texts, token_lists, voters=None):
+        """Returns the scores and the votes matrices (one row per voter, by default the enabled voters) and the
+            weights of the voters"""
+        values = []
         votes = []
+        weights = []
+        cache = {}
+
+        if voters is None:
+            voters = [voter for voter in self.__voters if voter.enabled]
 
-        # get ML classifiers result
-        for c in self.__classifiers:
-            v = c.classify(pd.get_word_feature())
-            votes.append(v)
+        for voter in voters:
+            start = time.perf_counter()
+            scores, voter_votes = voter.score_many(texts, token_lists, cache)
+            voter.elapsed += time.perf_counter() - start
+            voter.calls += 1
+            voter.nr_texts += len(texts)
 
-        # get Vader result
-        ss = self.__sid.polarity_scores(comment_text)
-        if ss["compound"] >= 0:
-            votes.append("pos")
-        else:
-            votes.append("neg")
+            values.append(scores)
+            votes.append(voter_votes)
+            weights.append(voter.weight)
 
-        # get ANEW result
-        anew_result = anew.sentiment(pd.get_tokens())['valence']
-        if anew_result >= 5.8:
-            votes.append("pos")
-        else:
-            votes.append("neg")
+        if not weights or not sum(weights):
+            raise ValueError("No enabled voter with a weight")
 
-        choice_votes = votes.count(mode(votes))
-        conf = choice_votes / float(len(votes))
+        return np.array(values, dtype=float), np.array(votes, dtype=bool), np.array(weights, dtype=float)
 
-        return conf
+    @staticmethod
+    def __combine(values, votes, weights):
+        """Returns the weighted mean scores and the confidences (weight of the most voted label / total weight)"""
+        total = weights.sum()
+
+        score = weights.dot(values) / total
+        pos_weight = weights.dot(votes)
+        conf = np.maximum(pos_weight, total - pos_weight) / total
+
+        return score, conf
+
+    @staticmethod
+    def __classifier_name(classifier, previous):
+        """Returns the voter name of an ml classifier: the name of its sklearn estimator (e.g. NuSVC), numbered
+            from 2 if previous classifiers have the same estimator"""
+        def estimator(c):
+            if isinstance(c, LinearScorer):
+                return c.estimator
+
+            return type(getattr(c, '_clf', c)).__name__
+
+        name = estimator(classifier)
+        count = sum(1 for c in previous if estimator(c) == name)
+
+        return name if not count else "%s_%d" % (name, count + 1)
 
     @staticmethod
     def map(value, left_min, left_max, right_min, right_max):
@@ -82,9 +353,8 @@ class VoteClassifier:
         left_span = left_max - left_min
         right_span = right_max - right_min
 
-        # Convert the left range into a 0-1 range (float)
-        value_scaled = float(value - left_min) / float(left_span)
+        # Convert the left range into a 0-1 range (float, or array of floats)
+        value_scaled = (value - left_min) / float(left_span)
 
         # Convert the 0-1 range into a value in the right range.
         return right_min + (value_scaled * right_span)
-